@@ -21,11 +21,28 @@ DATABASE_URL = (
     f"@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 )
 
+# Connection pool (per process). pre_ping + recycle avoid handing out dead
+# connections after a PostgreSQL restart or a proxy idle timeout.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "10"))  # wait for a free connection
+DB_POOL_RECYCLE_S = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
 # Qdrant
 QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
 QDRANT_COLLECTION = "enterprise_docs"
 
+# Qdrant collection tuning (applied on creation; `ingest.py --migrate-collection`
+# applies changes to an existing collection)
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))  # graph degree: recall vs. memory
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+QDRANT_HNSW_EF = int(os.getenv("QDRANT_HNSW_EF", "0"))  # search-time ef; 0 = server default
+QDRANT_ON_DISK_VECTORS = os.getenv("QDRANT_ON_DISK_VECTORS", "false").lower() == "true"
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none")  # "none" or "int8" (scalar)
+QDRANT_QUANTIZATION_RESCORE = os.getenv("QDRANT_QUANTIZATION_RESCORE", "true").lower() == "true"
+
 # Gemini
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 
@@ -33,13 +50,115 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 JWT_SECRET = os.getenv("JWT_SECRET", "ekip-dev-secret-change-in-prod")
 JWT_ALGORITHM = "HS256"
 
+# Stateless auth: embed roles, department and role_version in issued tokens so
+# authenticate() skips the user lookup (only a cached role_version check remains)
+JWT_EMBED_CLAIMS = os.getenv("JWT_EMBED_CLAIMS", "false").lower() == "true"
+ROLE_VERSION_TTL_S = float(os.getenv("ROLE_VERSION_TTL_S", "30"))  # revocation delay for other processes
+
+# Authenticated user contexts (roles + department) cached per user_id
+USER_CONTEXT_CACHE_SIZE = int(os.getenv("USER_CONTEXT_CACHE_SIZE", "10000"))
+USER_CONTEXT_TTL_S = float(os.getenv("USER_CONTEXT_TTL_S", "60"))
+
 # Paths
 DOCUMENTS_DIR = PROJECT_ROOT / "documents"
 BM25_INDEX_DIR = PROJECT_ROOT / "indexdir"
 
+# BM25 search: how often (seconds) the cached searcher checks for a new index generation
+BM25_REFRESH_INTERVAL_S = float(os.getenv("BM25_REFRESH_INTERVAL_S", "5"))
+
+# BM25 bulk writer (used during ingestion)
+BM25_WRITER_PROCS = int(os.getenv("BM25_WRITER_PROCS", "1"))  # >1 uses Whoosh's multiprocess writer
+BM25_WRITER_LIMITMB = int(os.getenv("BM25_WRITER_LIMITMB", "256"))  # indexing buffer per writer
+BM25_WRITER_MULTISEGMENT = os.getenv("BM25_WRITER_MULTISEGMENT", "false").lower() == "true"
+
+# Keyword search engine: "whoosh" (default) or "numpy" (array-backed BM25 index
+# under KEYWORD_INDEX_DIR, compiled from the Whoosh index after each ingest)
+KEYWORD_ENGINE = os.getenv("KEYWORD_ENGINE", "whoosh")
+KEYWORD_INDEX_DIR = PROJECT_ROOT / "keywordindex"
+
+# Vector store: "qdrant" (server) or "embedded" (in-process, memory-mapped files
+# under VECTOR_STORE_DIR; no Qdrant container needed)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "qdrant")
+VECTOR_STORE_DIR = PROJECT_ROOT / "vectorstore"
+VECTOR_STORE_BINARY = os.getenv("VECTOR_STORE_BINARY", "false").lower() == "true"  # 1-bit shortlist + rescoring
+VECTOR_STORE_OVERSAMPLE = int(os.getenv("VECTOR_STORE_OVERSAMPLE", "4"))  # shortlist = top_k * this
+VECTOR_STORE_REFRESH_S = float(os.getenv("VECTOR_STORE_REFRESH_S", "5"))  # API picks up re-ingests
+
 # Embedding model
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 EMBEDDING_DIM = 384
 
+# Inference backend for the embedding + reranker models: "torch", "onnx" or "onnx-int8"
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+ONNX_QUANTIZATION = os.getenv("ONNX_QUANTIZATION", "avx2")  # arm64 | avx2 | avx512 | avx512_vnni
+ONNX_MODEL_DIR = PROJECT_ROOT / "models"  # locally exported int8 models
+
+# Query embedding cache (LRU + TTL); set QUERY_CACHE_PATH to persist across restarts
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "10000"))
+QUERY_CACHE_TTL_S = float(os.getenv("QUERY_CACHE_TTL_S", "86400"))
+QUERY_CACHE_PATH = Path(os.getenv("QUERY_CACHE_PATH")) if os.getenv("QUERY_CACHE_PATH") else None
+
+# Query encoder micro-batching: concurrent queries arriving within
+# ENCODER_MAX_WAIT_MS are embedded in one call (up to ENCODER_MAX_BATCH_SIZE)
+ENCODER_MAX_BATCH_SIZE = int(os.getenv("ENCODER_MAX_BATCH_SIZE", "32"))
+ENCODER_MAX_WAIT_MS = float(os.getenv("ENCODER_MAX_WAIT_MS", "3"))
+
 # Reranker model
 RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# Reranker micro-batching: pairs from concurrent requests are scored together
+RERANK_MAX_BATCH_SIZE = int(os.getenv("RERANK_MAX_BATCH_SIZE", "128"))  # pairs per predict call
+RERANK_MAX_WAIT_MS = float(os.getenv("RERANK_MAX_WAIT_MS", "5"))
+RERANK_WORKERS = int(os.getenv("RERANK_WORKERS", "1"))  # batches scored in parallel
+
+# Rerank score cache keyed by (normalized query, chunk content hash)
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "200000"))
+RERANK_CACHE_TTL_S = float(os.getenv("RERANK_CACHE_TTL_S", "86400"))
+
+# Semantic answer cache: near-duplicate questions (cosine >= threshold) from
+# users with the same roles + filters reuse the generated answer. Entries are
+# dropped when a document they drew on changes (checked every POLL_S seconds).
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "5000"))  # 0 disables
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", "3600"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_POLL_S = float(os.getenv("ANSWER_CACHE_POLL_S", "30"))
+
+# Hybrid retrieval
+RETRIEVAL_THREADS = int(os.getenv("RETRIEVAL_THREADS", "8"))  # threads per leg (vector, BM25)
+RETRIEVAL_LEG_QUEUE = int(os.getenv("RETRIEVAL_LEG_QUEUE", "32"))  # max in-flight calls per leg before it is skipped
+RETRIEVAL_LEG_TIMEOUT_S = float(os.getenv("RETRIEVAL_LEG_TIMEOUT_S", "5"))  # per-leg budget
+FUSION_STRATEGY = os.getenv("FUSION_STRATEGY", "rrf")  # "rrf", "minmax" or "dbsf"
+FUSION_RRF_K = int(os.getenv("FUSION_RRF_K", "60"))
+
+# Retrieval engine:
+# - "hybrid": Qdrant dense search + local Whoosh BM25, fused in Python (default)
+# - "qdrant": one Qdrant query over dense + sparse BM25 vectors with server-side
+#   fusion; needs a collection created with sparse vectors (`ingest.py --full`)
+RETRIEVAL_ENGINE = os.getenv("RETRIEVAL_ENGINE", "hybrid")
+
+# Sparse BM25 vectors stored in Qdrant (IDF is computed server-side)
+SPARSE_BM25_K1 = float(os.getenv("SPARSE_BM25_K1", "1.2"))
+SPARSE_BM25_B = float(os.getenv("SPARSE_BM25_B", "0.75"))
+SPARSE_AVG_DOC_LEN = float(os.getenv("SPARSE_AVG_DOC_LEN", "250"))  # tokens per chunk, after stop words
+
+# Audit log writer: events are queued and inserted in batches of up to
+# AUDIT_BATCH_SIZE, at most AUDIT_FLUSH_INTERVAL_S after the first queued event
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))  # events beyond this are dropped
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL_S = float(os.getenv("AUDIT_FLUSH_INTERVAL_S", "1"))
+# A failed INSERT is retried with exponential backoff; if it still fails the
+# batch is spilled to AUDIT_SPILL_DIR and replayed after the next successful write
+AUDIT_RETRY_ATTEMPTS = int(os.getenv("AUDIT_RETRY_ATTEMPTS", "5"))
+AUDIT_RETRY_BACKOFF_S = float(os.getenv("AUDIT_RETRY_BACKOFF_S", "0.5"))  # doubles per attempt, max 30s
+AUDIT_SPILL_DIR = PROJECT_ROOT / "cache" / "audit_spill"
+
+# Audit log partitions (monthly): created this many months ahead, dropped
+# by scripts/audit_retention.py once older than AUDIT_RETENTION_MONTHS
+AUDIT_PARTITIONS_AHEAD = int(os.getenv("AUDIT_PARTITIONS_AHEAD", "3"))
+AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "12"))
+
+# Ingestion pipeline
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))  # parse processes
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "256"))  # chunks per encode call
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "16"))  # documents buffered per stage
+INGEST_UPSERT_THREADS = int(os.getenv("INGEST_UPSERT_THREADS", "4"))
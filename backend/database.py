@@ -1,19 +1,82 @@
 """
 Database connection and session management using SQLAlchemy.
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from backend.config import DATABASE_URL
+from contextlib import contextmanager
 
-engine = create_engine(DATABASE_URL, echo=False)
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from backend.config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT_S,
+    DB_POOL_RECYCLE_S, DB_POOL_PRE_PING,
+)
+
+engine = create_engine(
+    DATABASE_URL,
+    echo=False,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT_S,
+    pool_recycle=DB_POOL_RECYCLE_S,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
 
 def get_db():
-    """Yield a database session, auto-close on exit."""
+    """
+    Yield a database session, auto-close on exit.
+
+    Used as a FastAPI dependency, so every lookup within one request shares a
+    session. No connection is checked out until the first query.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@contextmanager
+def session_scope(db: Session | None = None):
+    """Use the caller's session if given, otherwise open (and close) a fresh one."""
+    if db is not None:
+        yield db
+        return
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+# ── Pool metrics ──
+_pool_counters = {"connects": 0, "checkouts": 0, "invalidated": 0}
+
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_conn, conn_record):
+    _pool_counters["connects"] += 1
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_conn, conn_record, conn_proxy):
+    _pool_counters["checkouts"] += 1
+
+
+@event.listens_for(engine, "invalidate")
+def _on_invalidate(dbapi_conn, conn_record, exception):
+    _pool_counters["invalidated"] += 1
+
+
+def pool_status() -> dict:
+    """Connection pool utilization, for the metrics endpoint."""
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        **_pool_counters,
+    }
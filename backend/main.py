@@ -3,16 +3,59 @@ EKIP — Enterprise Knowledge Intelligence Platform
 
 FastAPI application entry point.
 """
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.routers.auth_router import router as auth_router
 from backend.routers.search_router import router as search_router
+from backend.services.embedder import (
+    load_query_cache, save_query_cache, query_cache_stats, query_batcher_stats,
+    close_async_qdrant_client,
+)
+from backend.services.reranker import rerank_batcher_stats, rerank_cache_stats
+from backend.services.answer_cache import answer_cache
+from backend.services.auth import user_context_cache_stats
+from backend.services.audit import audit_writer, audit_writer_stats
+from backend.services.audit_partitions import ensure_upcoming_partitions
+from backend.database import pool_status
+from backend.config import ANSWER_CACHE_POLL_S
+
+
+async def _watch_document_changes():
+    """Invalidate cached answers whose source documents were re-ingested."""
+    while True:
+        try:
+            await run_in_threadpool(answer_cache.poll_document_changes)
+        except Exception as e:
+            print(f"  ⚠ Answer cache invalidation poll failed: {e}")
+        await asyncio.sleep(ANSWER_CACHE_POLL_S)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup / shutdown hooks."""
+    load_query_cache()
+    try:
+        await run_in_threadpool(ensure_upcoming_partitions)
+    except Exception as e:
+        print(f"  ⚠ Could not create audit log partitions: {e}")
+    watcher = asyncio.create_task(_watch_document_changes())
+    yield
+    watcher.cancel()
+    await run_in_threadpool(audit_writer.stop)  # flush queued audit events
+    save_query_cache()
+    await close_async_qdrant_client()
+
 
 app = FastAPI(
     title="Knowledge Base",
     description="Internal document search with AI-powered answers and role-based access.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS — allow React dev server
@@ -35,6 +78,21 @@ def health_check():
     return {"status": "ok", "service": "knowledge-base"}
 
 
+@app.get("/api/metrics")
+def metrics():
+    """In-process cache and pool metrics."""
+    return {
+        "query_embedding_cache": query_cache_stats(),
+        "query_encoder_batching": query_batcher_stats(),
+        "reranker_batching": rerank_batcher_stats(),
+        "rerank_score_cache": rerank_cache_stats(),
+        "answer_cache": answer_cache.stats(),
+        "user_context_cache": user_context_cache_stats(),
+        "audit_writer": audit_writer_stats(),
+        "db_pool": pool_status(),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -6,8 +6,8 @@ import uuid
 from datetime import datetime, timezone
 
 from sqlalchemy import (
-    Column, String, Integer, Boolean, Text, DateTime, ForeignKey,
-    Table, ARRAY
+    Column, String, Integer, BigInteger, Boolean, Text, DateTime, ForeignKey,
+    Table, ARRAY, Index, Identity
 )
 from sqlalchemy.orm import relationship
 from backend.database import Base
@@ -28,6 +28,8 @@ class User(Base):
     user_id = Column(String, primary_key=True)
     email = Column(String, unique=True, nullable=False)
     department = Column(String, nullable=False)
+    # Bumped whenever roles/department change; tokens carrying an older value are rejected
+    role_version = Column(Integer, nullable=False, default=1)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     roles = relationship("Role", secondary=user_roles, back_populates="users")
@@ -53,15 +55,28 @@ class Document(Base):
     department = Column(String, nullable=False)
     classification = Column(String, nullable=False)  # "public" or "restricted"
     file_path = Column(Text, nullable=False)
+    content_hash = Column(String)  # SHA-256 of file bytes + metadata, for incremental ingest
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
 
 class AccessAuditLog(Base):
-    __tablename__ = "access_audit_log"
+    """
+    Search audit trail, range-partitioned by month on `timestamp`.
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    Partitions are created/dropped by backend.services.audit_partitions, so
+    the primary key must include the partition key.
+    """
+    __tablename__ = "access_audit_log"
+    __table_args__ = (
+        Index("ix_access_audit_log_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_access_audit_log_timestamp", "timestamp"),
+        Index("ix_access_audit_log_doc_ids", "doc_ids", postgresql_using="gin"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+    id = Column(BigInteger, Identity(), primary_key=True)
     user_id = Column(String, nullable=False)
     query_text = Column(Text)
-    doc_ids = Column(Text)  # stored as comma-separated UUIDs for portability
-    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    doc_ids = Column(ARRAY(String), nullable=False, default=list)  # GIN-indexed for "who accessed doc X"
+    timestamp = Column(DateTime, primary_key=True, default=lambda: datetime.now(timezone.utc))
     allowed = Column(Boolean, nullable=False, default=True)
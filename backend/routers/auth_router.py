@@ -1,10 +1,13 @@
 """
 Auth router — login endpoint.
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy.orm import Session, joinedload
 
-from backend.services.auth import create_token, get_user_context
+from backend.database import get_db
+from backend.models import User
+from backend.services.auth import create_token, cache_user_context
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -22,31 +25,30 @@ class LoginResponse(BaseModel):
 
 
 @router.post("/login", response_model=LoginResponse)
-def login(req: LoginRequest):
+def login(req: LoginRequest, db: Session = Depends(get_db)):
     """
     Login with an email address. Returns a JWT token.
 
     For the PoC, any registered demo user email works (no password needed).
     """
     # Find user by email
-    from backend.database import SessionLocal
-    from backend.models import User
-
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.email == req.email).first()
-        if not user:
-            raise HTTPException(status_code=401, detail=f"Unknown user: {req.email}")
-
-        token = create_token(user.user_id)
-        ctx = get_user_context(user.user_id)
-
-        return LoginResponse(
-            token=token,
-            user_id=ctx.user_id,
-            email=ctx.email,
-            department=ctx.department,
-            roles=ctx.roles,
-        )
-    finally:
-        db.close()
+    user = (
+        db.query(User)
+        .options(joinedload(User.roles))
+        .filter(User.email == req.email)
+        .first()
+    )
+    if not user:
+        raise HTTPException(status_code=401, detail=f"Unknown user: {req.email}")
+
+    # Fresh login refreshes the cached context used by authenticate()
+    ctx = cache_user_context(user)
+    token = create_token(user.user_id, ctx)
+
+    return LoginResponse(
+        token=token,
+        user_id=ctx.user_id,
+        email=ctx.email,
+        department=ctx.department,
+        roles=ctx.roles,
+    )
@@ -1,15 +1,23 @@
 """
 Search router — main search/ask endpoint.
 """
+import json
 import time
 from fastapi import APIRouter, HTTPException, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from backend.services.auth import authenticate
-from backend.services.retriever import hybrid_search
-from backend.services.reranker import rerank
-from backend.services.generator import generate_answer
-from backend.services.audit import log_search
+from backend.services.embedder import encode_query_async
+from backend.services.answer_cache import answer_cache, scope_key
+from backend.services.retriever import hybrid_search_async
+from backend.services.reranker import rerank_async
+from backend.services.generator import (
+    generate_answer_async, stream_answer, parse_citations, citation_for, CitationTracker,
+    is_fallback_answer,
+)
+from backend.services.audit import log_search_background
 
 router = APIRouter(prefix="/api", tags=["search"])
 
@@ -17,6 +25,7 @@ router = APIRouter(prefix="/api", tags=["search"])
 class SearchRequest(BaseModel):
     query: str
     department_filter: str | None = None
+    classification_filter: str | None = None
 
 
 class CitationItem(BaseModel):
@@ -35,42 +44,84 @@ class SearchResponse(BaseModel):
 
 
 @router.post("/search", response_model=SearchResponse)
-def search(req: SearchRequest, authorization: str = Header(...)):
+async def search(
+    req: SearchRequest,
+    authorization: str = Header(...),
+):
     """
     Search the knowledge base and get an AI-generated answer.
 
     Requires a Bearer token from the login endpoint.
+
+    Fully async: model inference is awaited on the micro-batching workers,
+    Qdrant and Gemini use async clients, and blocking work (DB auth, Whoosh,
+    audit insert) runs off the event loop, so a worker can hold many
+    in-flight LLM calls at once.
+
+    Near-duplicate questions from users with the same permission scope are
+    answered from the semantic answer cache.
     """
     start = time.time()
 
-    # Authenticate
+    # Authenticate (DB lookup → threadpool). No request-scoped session: a cache
+    # miss opens a short-lived one, so no pooled connection is held while
+    # retrieval and Gemini are awaited.
     token = authorization.replace("Bearer ", "")
-    user_ctx = authenticate(token)
+    user_ctx = await run_in_threadpool(authenticate, token)
     if not user_ctx:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
+    # Semantic answer cache (the query embedding is reused by vector search)
+    query_vector = await encode_query_async(req.query)
+    scope = scope_key(user_ctx, req.department_filter, req.classification_filter)
+    cached = answer_cache.lookup(query_vector, scope)
+    if cached:
+        log_search_background(
+            user_id=user_ctx.user_id,
+            query_text=req.query,
+            doc_ids=list(cached.doc_ids),
+            allowed=True,
+        )
+        return SearchResponse(
+            answer=cached.answer,
+            citations=[CitationItem(**c) for c in cached.citations],
+            latency_ms=int((time.time() - start) * 1000),
+            chunks_found=cached.chunks_found,
+        )
+
     # Search
-    candidates = hybrid_search(
+    candidates = await hybrid_search_async(
         query=req.query,
         user_ctx=user_ctx,
         department_filter=req.department_filter,
+        classification_filter=req.classification_filter,
     )
 
     # Rerank
-    ranked = rerank(query=req.query, candidates=candidates, top_n=8)
+    ranked = await rerank_async(query=req.query, candidates=candidates, top_n=8)
 
     # Generate answer
-    result = generate_answer(question=req.query, ranked_chunks=ranked)
+    result = await generate_answer_async(question=req.query, ranked_chunks=ranked)
 
-    # Audit log
+    # Audit log (fire-and-forget)
     doc_ids = list(set(r.get("doc_id", "") for r in ranked))
-    log_search(
+    log_search_background(
         user_id=user_ctx.user_id,
         query_text=req.query,
         doc_ids=doc_ids,
         allowed=True,
     )
 
+    if ranked and not is_fallback_answer(result["answer"]):
+        answer_cache.store(
+            query_vector, scope,
+            answer=result["answer"],
+            citations=result["citations"],
+            sources=[citation_for(i, ranked) for i in range(1, len(ranked) + 1)],
+            chunks_found=len(candidates),
+            doc_ids=doc_ids,
+        )
+
     elapsed_ms = int((time.time() - start) * 1000)
 
     return SearchResponse(
@@ -79,3 +130,116 @@ def search(req: SearchRequest, authorization: str = Header(...)):
         latency_ms=elapsed_ms,
         chunks_found=len(candidates),
     )
+
+
+@router.post("/search/stream")
+async def search_stream(
+    req: SearchRequest,
+    authorization: str = Header(...),
+):
+    """
+    Search and stream the AI answer as Server-Sent Events.
+
+    Events, in order:
+    - `sources`:  the ranked chunks the answer may cite (sent before generation starts)
+    - `token`:    an answer text delta
+    - `citation`: a source the answer cited for the first time
+    - `done`:     final citations, latency and chunk count
+
+    A semantic answer cache hit replays the same events with the whole
+    answer as a single `token`.
+    """
+    start = time.time()
+
+    token = authorization.replace("Bearer ", "")
+    user_ctx = await run_in_threadpool(authenticate, token)
+    if not user_ctx:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    query_vector = await encode_query_async(req.query)
+    scope = scope_key(user_ctx, req.department_filter, req.classification_filter)
+    cached = answer_cache.lookup(query_vector, scope)
+    if cached:
+        return StreamingResponse(
+            _replay_cached(cached, user_ctx.user_id, req.query, start),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    candidates = await hybrid_search_async(
+        query=req.query,
+        user_ctx=user_ctx,
+        department_filter=req.department_filter,
+        classification_filter=req.classification_filter,
+    )
+    ranked = await rerank_async(query=req.query, candidates=candidates, top_n=8)
+
+    async def events():
+        sources = [citation_for(i, ranked) for i in range(1, len(ranked) + 1)]
+        yield _sse("sources", {"sources": sources, "chunks_found": len(candidates)})
+
+        tracker = CitationTracker(ranked)
+        parts = []
+        async for delta in stream_answer(question=req.query, ranked_chunks=ranked):
+            parts.append(delta)
+            yield _sse("token", {"text": delta})
+            for citation in tracker.feed(delta):
+                yield _sse("citation", citation)
+
+        doc_ids = list(set(r.get("doc_id", "") for r in ranked))
+        log_search_background(
+            user_id=user_ctx.user_id,
+            query_text=req.query,
+            doc_ids=doc_ids,
+            allowed=True,
+        )
+
+        answer = "".join(parts)
+        citations = parse_citations(answer, ranked)
+        if ranked and not is_fallback_answer(answer):
+            answer_cache.store(
+                query_vector, scope,
+                answer=answer,
+                citations=citations,
+                sources=sources,
+                chunks_found=len(candidates),
+                doc_ids=doc_ids,
+            )
+
+        yield _sse("done", {
+            "citations": citations,
+            "latency_ms": int((time.time() - start) * 1000),
+            "chunks_found": len(candidates),
+        })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _replay_cached(cached, user_id: str, query: str, start: float):
+    """SSE events for a semantic answer cache hit."""
+    yield _sse("sources", {"sources": cached.sources, "chunks_found": cached.chunks_found})
+    yield _sse("token", {"text": cached.answer})
+    for citation in cached.citations:
+        yield _sse("citation", citation)
+
+    log_search_background(
+        user_id=user_id,
+        query_text=query,
+        doc_ids=list(cached.doc_ids),
+        allowed=True,
+    )
+
+    yield _sse("done", {
+        "citations": cached.citations,
+        "latency_ms": int((time.time() - start) * 1000),
+        "chunks_found": cached.chunks_found,
+    })
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
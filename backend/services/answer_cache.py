@@ -0,0 +1,200 @@
+"""
+Semantic answer cache — serves near-duplicate questions without re-running
+hybrid search, reranking and Gemini.
+
+Entries are looked up by query-embedding cosine similarity, but only within
+the caller's permission scope (role set + filters), so an answer built from
+restricted chunks is never served to a user who couldn't see them.
+An entry is dropped as soon as any document in its context is re-ingested
+or removed (detected by polling document content hashes in PostgreSQL).
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+from backend.config import (
+    ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL_S, ANSWER_CACHE_THRESHOLD,
+)
+from backend.database import SessionLocal
+from backend.models import Document
+from backend.services.auth import UserContext
+
+
+@dataclass
+class CachedAnswer:
+    """A cached search result plus what it depends on."""
+    vector: np.ndarray
+    answer: str
+    citations: list[dict]
+    sources: list[dict]
+    chunks_found: int
+    doc_ids: frozenset[str]
+    expires_at: float
+
+
+def scope_key(
+    user_ctx: UserContext,
+    department_filter: str | None = None,
+    classification_filter: str | None = None,
+) -> tuple:
+    """Permission scope: answers are only shared between identical role sets + filters."""
+    return (tuple(sorted(user_ctx.roles)), department_filter, classification_filter)
+
+
+class SemanticAnswerCache:
+    """Thread-safe similarity cache, partitioned by permission scope."""
+
+    def __init__(
+        self,
+        maxsize: int = ANSWER_CACHE_SIZE,
+        ttl: float = ANSWER_CACHE_TTL_S,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+
+        self._scopes: dict[tuple, list[CachedAnswer]] = {}
+        self._matrices: dict[tuple, np.ndarray] = {}  # stacked vectors per scope
+        self._order: deque[tuple[tuple, CachedAnswer]] = deque()  # insertion order for eviction
+        self._lock = threading.Lock()
+        self._doc_hashes: dict[str, str | None] | None = None
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, vector: np.ndarray, scope: tuple) -> CachedAnswer | None:
+        """Return the most similar live entry in `scope` above the threshold."""
+        if self.maxsize <= 0:
+            return None
+        v = _unit(vector)
+        now = time.time()
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries:
+                matrix = self._matrices.get(scope)
+                if matrix is None:
+                    matrix = self._matrices[scope] = np.stack([e.vector for e in entries])
+                sims = matrix @ v
+                # Expired entries can't shadow a live match in the same scope
+                expired = np.fromiter((e.expires_at <= now for e in entries), dtype=bool, count=len(entries))
+                sims[expired] = -np.inf
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    self.hits += 1
+                    return entries[best]
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        vector: np.ndarray,
+        scope: tuple,
+        answer: str,
+        citations: list[dict],
+        sources: list[dict],
+        chunks_found: int,
+        doc_ids: list[str],
+    ):
+        """Cache a freshly generated answer."""
+        if self.maxsize <= 0:
+            return
+        entry = CachedAnswer(
+            vector=_unit(vector),
+            answer=answer,
+            citations=citations,
+            sources=sources,
+            chunks_found=chunks_found,
+            doc_ids=frozenset(doc_ids),
+            expires_at=time.time() + self.ttl,
+        )
+        with self._lock:
+            self._purge_expired()
+            while len(self._order) >= self.maxsize:
+                old_scope, old_entry = self._order.popleft()
+                self._remove(old_scope, old_entry)
+            self._scopes.setdefault(scope, []).append(entry)
+            self._matrices.pop(scope, None)
+            self._order.append((scope, entry))
+
+    def invalidate_documents(self, doc_ids: set[str]) -> int:
+        """Drop every entry whose context included one of `doc_ids`."""
+        with self._lock:
+            stale = [(s, e) for s, e in self._order if e.doc_ids & doc_ids]
+            for scope, entry in stale:
+                self._remove(scope, entry)
+            self._order = deque((s, e) for s, e in self._order if not e.doc_ids & doc_ids)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._scopes.clear()
+            self._matrices.clear()
+            self._order.clear()
+
+    def poll_document_changes(self) -> int:
+        """
+        Compare document content hashes with the previous poll and invalidate
+        entries citing documents that were re-ingested or removed.
+
+        Blocking (one query on the documents table) — run it off the event loop.
+
+        Returns:
+            Number of cache entries invalidated.
+        """
+        db = SessionLocal()
+        try:
+            current = dict(db.query(Document.id, Document.content_hash).all())
+        finally:
+            db.close()
+
+        previous, self._doc_hashes = self._doc_hashes, current
+        if previous is None:
+            return 0  # first poll only records the baseline
+
+        changed = {doc_id for doc_id, h in previous.items() if current.get(doc_id, "<removed>") != h}
+        return self.invalidate_documents(changed) if changed else 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._order),
+            "maxsize": self.maxsize,
+            "scopes": len(self._scopes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+    # ── Internal (lock held) ──
+
+    def _remove(self, scope: tuple, entry: CachedAnswer):
+        entries = self._scopes.get(scope)
+        if not entries:
+            return
+        entries[:] = [e for e in entries if e is not entry]
+        self._matrices.pop(scope, None)
+        if not entries:
+            del self._scopes[scope]
+
+    def _purge_expired(self):
+        now = time.time()
+        while self._order and self._order[0][1].expires_at <= now:
+            scope, entry = self._order.popleft()
+            self._remove(scope, entry)
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else v
+
+
+# ── Process-wide instance ──
+answer_cache = SemanticAnswerCache()
@@ -1,28 +1,373 @@
 """
 Audit logging — records every search for compliance.
+
+Request handlers enqueue events on an in-memory queue; a background thread
+writes them in bulk (one multi-row INSERT per batch) when a batch fills up
+or the flush interval elapses, and drains the queue on shutdown.
+
+A batch whose INSERT keeps failing is spilled to a local JSON-lines file
+(one per process) rather than discarded; spilled rows are written once the
+database accepts inserts again, by the same process or, after it exited,
+any other one.
 """
+import ctypes
+import json
+import os
+import queue
+import threading
+import time
 from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import insert, select
+
+from backend.config import (
+    AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL_S,
+    AUDIT_RETRY_ATTEMPTS, AUDIT_RETRY_BACKOFF_S, AUDIT_SPILL_DIR,
+)
 from backend.database import SessionLocal
 from backend.models import AccessAuditLog
 
 
+def _audit_row(user_id: str, query_text: str, doc_ids: list[str], allowed: bool) -> dict:
+    return {
+        "user_id": user_id,
+        "query_text": query_text,
+        "doc_ids": list(doc_ids),
+        "timestamp": datetime.now(timezone.utc),
+        "allowed": allowed,
+    }
+
+
+def write_audit_rows(rows: list[dict]):
+    """Insert audit rows in one multi-row INSERT and commit."""
+    if not rows:
+        return
+    db = SessionLocal()
+    try:
+        db.execute(insert(AccessAuditLog), rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+_MAX_BACKOFF_S = 30.0
+
+
+def _spill_rows(path: Path, rows: list[dict]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps({**row, "timestamp": row["timestamp"].isoformat()}) + "\n")
+
+
+def _read_spilled(path: Path) -> tuple[list[dict], list[str]]:
+    """Parsed rows, plus the lines that couldn't be parsed (e.g. truncated by a crash)."""
+    rows, bad = [], []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+            except (ValueError, KeyError, TypeError):
+                bad.append(line)
+                continue
+            rows.append(row)
+    return rows, bad
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether process `pid` is running (and so may still append to its spill file)."""
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _spill_pid(name: str) -> int | None:
+    """Owner pid from audit-<pid>.jsonl, or claimer pid from replay-<pid>-audit-<pid>.jsonl."""
+    try:
+        return int(name.split("-")[1].split(".")[0])
+    except (IndexError, ValueError):
+        return None
+
+
+class AuditWriter:
+    """
+    Bounded queue of audit rows flushed in bulk by a background thread.
+
+    Events are dropped (and counted) rather than blocking a request when the
+    queue is full, e.g. while the database is unavailable. A failed batch is
+    retried with backoff, then spilled to `spill_dir` and replayed later.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = AUDIT_QUEUE_SIZE,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval_s: float = AUDIT_FLUSH_INTERVAL_S,
+        retry_attempts: int = AUDIT_RETRY_ATTEMPTS,
+        retry_backoff_s: float = AUDIT_RETRY_BACKOFF_S,
+        spill_dir: Path = AUDIT_SPILL_DIR,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval_s)
+        self.retry_attempts = max(0, retry_attempts)
+        self.retry_backoff = max(0.0, retry_backoff_s)
+        self.spill_dir = spill_dir
+
+        self._queue: queue.Queue[dict] = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0   # queue full
+        self.retries = 0   # INSERT attempts repeated after an error
+        self.spilled = 0   # written to the spill file after retries ran out
+        self.replayed = 0  # spilled rows later inserted
+        self.corrupt = 0   # unparseable spill lines, moved to quarantine.jsonl
+        self.failed = 0    # lost: INSERT and spill both failed
+        self.batches = 0
+
+    def enqueue(self, row: dict) -> bool:
+        """Queue a row for the next flush. Returns False if it was dropped."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def stop(self, timeout: float | None = 10.0):
+        """Flush everything queued so far and stop the writer thread."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "backlog": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "retries": self.retries,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "corrupt": self.corrupt,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch_size": round(self.written / self.batches, 2) if self.batches else 0.0,
+        }
+
+    # ── Worker ──
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._worker, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def _collect_batch(self) -> list[dict]:
+        """Wait for the first row, then gather more until full, the interval elapses, or shutdown."""
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            if deadline is None:
+                timeout = 0.1  # idle: wake up periodically to notice shutdown
+            else:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break
+                continue
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch
+
+    def _worker(self):
+        while True:
+            try:
+                batch = self._collect_batch()
+                if batch:
+                    self._flush(batch)
+                elif self._stopping.is_set():
+                    return
+            except Exception as e:
+                # Keep the thread alive; a dead writer would drop every later event
+                print(f"  ⚠ Audit writer error: {e}")
+
+    def _flush(self, batch: list[dict]):
+        delay = self.retry_backoff
+        for attempt in range(self.retry_attempts + 1):
+            try:
+                write_audit_rows(batch)
+            except Exception as e:
+                error = e
+                # Don't hold up shutdown with retries; the spill file keeps the rows
+                if attempt == self.retry_attempts or self._stopping.is_set():
+                    break
+                self.retries += 1
+                self._stopping.wait(delay)
+                delay = min(delay * 2, _MAX_BACKOFF_S)
+                continue
+            self.written += len(batch)
+            self.batches += 1
+            try:
+                self._replay_spilled()
+            except Exception as e:
+                print(f"  ⚠ Audit spill replay failed: {e}")
+            return
+        self._spill(batch, error)
+
+    def _spill_path(self) -> Path:
+        return self.spill_dir / f"audit-{os.getpid()}.jsonl"
+
+    def _spill(self, batch: list[dict], error: Exception):
+        try:
+            _spill_rows(self._spill_path(), batch)
+        except Exception as spill_error:
+            self.failed += len(batch)
+            print(f"  ⚠ Audit log write failed ({len(batch)} events lost): {error}; spill failed: {spill_error}")
+            return
+        self.spilled += len(batch)
+        print(f"  ⚠ Audit log write failed ({len(batch)} events spilled to {self.spill_dir}): {error}")
+
+    def _replay_spilled(self):
+        """
+        Insert spilled rows. A process replays its own file, and files of
+        processes that have exited (including replays they didn't finish);
+        a file is claimed by renaming it to replay-<our pid>-<name>.
+        """
+        if not self.spill_dir.exists():
+            return
+        pid = os.getpid()
+        for path in sorted(self.spill_dir.glob("replay-*.jsonl")) + sorted(self.spill_dir.glob("audit-*.jsonl")):
+            owner = _spill_pid(path.name)
+            if owner is None or (owner != pid and _pid_alive(owner)):
+                continue
+            if path.name.startswith(f"replay-{pid}-"):
+                claimed = path
+            else:
+                original = path.name.split("-", 2)[2] if path.name.startswith("replay-") else path.name
+                claimed = path.with_name(f"replay-{pid}-{original}")
+                try:
+                    path.rename(claimed)
+                    _rename_if_exists(_progress_path(path), _progress_path(claimed))
+                except OSError:
+                    continue  # claimed by another process
+            if not self._replay_file(claimed):
+                return  # database unavailable again; retried after the next successful flush
+
+    def _replay_file(self, claimed: Path) -> bool:
+        """Insert a claimed spill file's rows; False (file kept) if an INSERT fails."""
+        progress = _progress_path(claimed)
+        done = int(progress.read_text() or 0) if progress.exists() else 0
+        rows, bad = _read_spilled(claimed)
+        if bad and not progress.exists():
+            with open(self.spill_dir / "quarantine.jsonl", "a", encoding="utf-8") as f:
+                f.writelines(line if line.endswith("\n") else line + "\n" for line in bad)
+            self.corrupt += len(bad)
+            print(f"  ⚠ {len(bad)} unreadable audit spill lines moved to quarantine.jsonl")
+            progress.write_text(str(done))
+
+        for start in range(done, len(rows), self.batch_size):
+            chunk = rows[start : start + self.batch_size]
+            try:
+                write_audit_rows(chunk)
+            except Exception as e:
+                print(f"  ⚠ Audit spill replay failed, {len(rows) - start} events kept: {e}")
+                return False
+            self.replayed += len(chunk)
+            # Survives a crash mid-replay without inserting rows twice
+            progress.write_text(str(start + len(chunk)))
+
+        claimed.unlink()
+        progress.unlink(missing_ok=True)
+        print(f"  Replayed {len(rows) - done} spilled audit events from {claimed.name}")
+        return True
+
+
+def _progress_path(path: Path) -> Path:
+    return path.with_name(path.name + ".done")
+
+
+def _rename_if_exists(src: Path, dst: Path):
+    if src.exists():
+        src.rename(dst)
+
+
+# ── Process-wide writer ──
+audit_writer = AuditWriter()
+
+
 def log_search(
     user_id: str,
     query_text: str,
     doc_ids: list[str],
     allowed: bool = True,
 ):
-    """Log a search event to the audit log."""
+    """Log a search event to the audit log synchronously."""
+    write_audit_rows([_audit_row(user_id, query_text, doc_ids, allowed)])
+
+
+def log_search_background(
+    user_id: str,
+    query_text: str,
+    doc_ids: list[str],
+    allowed: bool = True,
+):
+    """Queue a search event for the batched audit writer and return immediately."""
+    audit_writer.enqueue(_audit_row(user_id, query_text, doc_ids, allowed))
+
+
+def audit_writer_stats() -> dict:
+    return audit_writer.stats()
+
+
+def find_document_access(doc_id: str, since: datetime, until: datetime | None = None) -> list[dict]:
+    """
+    Compliance query: every search whose results included `doc_id` in [since, until).
+
+    Uses the GIN index on doc_ids (`@>`), and the time range prunes partitions.
+    """
+    stmt = (
+        select(AccessAuditLog.user_id, AccessAuditLog.query_text, AccessAuditLog.timestamp, AccessAuditLog.allowed)
+        .where(AccessAuditLog.doc_ids.contains([doc_id]))
+        .where(AccessAuditLog.timestamp >= since)
+        .order_by(AccessAuditLog.timestamp)
+    )
+    if until is not None:
+        stmt = stmt.where(AccessAuditLog.timestamp < until)
+
     db = SessionLocal()
     try:
-        entry = AccessAuditLog(
-            user_id=user_id,
-            query_text=query_text,
-            doc_ids=",".join(doc_ids),
-            timestamp=datetime.now(timezone.utc),
-            allowed=allowed,
-        )
-        db.add(entry)
-        db.commit()
+        return [dict(row._mapping) for row in db.execute(stmt)]
     finally:
         db.close()
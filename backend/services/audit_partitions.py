@@ -0,0 +1,184 @@
+"""
+Audit log partition management — monthly RANGE partitions of access_audit_log.
+
+Partitions are named access_audit_log_yYYYYmMM and cover [first of month,
+first of next month). Upcoming months are created ahead of time (on app
+startup and by scripts/audit_retention.py); retention drops whole
+partitions, which is instant compared to a bulk DELETE.
+
+A DEFAULT partition (access_audit_log_default) catches rows outside every
+monthly range, so inserts never fail if the retention job hasn't run.
+Creating a month's partition later moves its rows out of the default one.
+"""
+import re
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from backend.config import AUDIT_PARTITIONS_AHEAD
+from backend.database import engine
+from backend.models import AccessAuditLog
+
+PARENT = AccessAuditLog.__tablename__
+DEFAULT_PARTITION = f"{PARENT}_default"
+_PARTITION_RE = re.compile(rf"^{PARENT}_y(\d{{4}})m(\d{{2}})$")
+
+
+def month_start(d: date | datetime) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+def _table_exists(conn: Connection, name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def create_partition(conn: Connection, month: date):
+    """
+    Create the partition holding `month` if it doesn't exist yet, moving any
+    of its rows out of the default partition (Postgres refuses to create a
+    range partition whose rows already sit in the default one).
+    """
+    start = month_start(month)
+    name = partition_name(start)
+    bounds = f"FROM ('{start.isoformat()}') TO ('{add_months(start, 1).isoformat()}')"
+    if _table_exists(conn, name):
+        return
+
+    range_filter = f"timestamp >= '{start.isoformat()}' AND timestamp < '{add_months(start, 1).isoformat()}'"
+    if not _table_exists(conn, DEFAULT_PARTITION) or not conn.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {range_filter})")
+    ).scalar():
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT} FOR VALUES {bounds}"))
+        return
+
+    # Stage the month's rows in a standalone table, then attach it
+    # (indexes are created on attach)
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {range_filter} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    )).rowcount
+    conn.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    print(f"  Moved {moved} audit rows from {DEFAULT_PARTITION} into {name}")
+
+
+def create_default_partition(conn: Connection):
+    """Create the catch-all DEFAULT partition if it doesn't exist yet."""
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"))
+
+
+def default_partition_range(conn: Connection) -> tuple[int, datetime | None, datetime | None]:
+    """(row count, oldest, newest timestamp) of the rows in the default partition."""
+    if not _table_exists(conn, DEFAULT_PARTITION):
+        return 0, None, None
+    count, oldest, newest = conn.execute(
+        text(f"SELECT count(*), min(timestamp), max(timestamp) FROM {DEFAULT_PARTITION}")
+    ).one()
+    return count, oldest, newest
+
+
+def partition_months(since: date | None = None, until: date | None = None, months_ahead: int = 3) -> list[date]:
+    """
+    Months from `since` (default: this month) through `months_ahead` months
+    from now, or through `until` if that is later.
+    """
+    current = month_start(datetime.now(timezone.utc))
+    month = month_start(since) if since else current
+    last = add_months(current, months_ahead)
+    if until is not None:
+        last = max(last, month_start(until))
+    months = []
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def ensure_partitions(
+    conn: Connection,
+    since: date | None = None,
+    months_ahead: int = 3,
+    until: date | None = None,
+) -> int:
+    """
+    Create the monthly partitions for partition_months(since, until, months_ahead).
+
+    Returns:
+        Number of months covered.
+    """
+    months = partition_months(since, until, months_ahead)
+    for month in months:
+        create_partition(conn, month)
+    return len(months)
+
+
+def missing_partitions(
+    conn: Connection,
+    since: date | None = None,
+    months_ahead: int = 3,
+    until: date | None = None,
+) -> list[str]:
+    """Names of the partitions ensure_partitions() would create (read-only)."""
+    return [
+        partition_name(month) for month in partition_months(since, until, months_ahead)
+        if not _table_exists(conn, partition_name(month))
+    ]
+
+
+def ensure_upcoming_partitions():
+    """Create this month's and the next AUDIT_PARTITIONS_AHEAD months' partitions."""
+    with engine.begin() as conn:
+        create_default_partition(conn)
+        ensure_partitions(conn, months_ahead=AUDIT_PARTITIONS_AHEAD)
+
+
+def list_partitions(conn: Connection) -> list[tuple[str, date]]:
+    """(name, month) of every monthly partition, oldest first."""
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :parent"
+    ), {"parent": PARENT}).scalars()
+
+    partitions = []
+    for name in rows:
+        m = _PARTITION_RE.match(name)
+        if m:
+            partitions.append((name, date(int(m.group(1)), int(m.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def drop_partitions_before(conn: Connection, cutoff: date, dry_run: bool = False) -> list[str]:
+    """
+    Drop every partition whose whole month lies before `cutoff`'s month.
+
+    Returns:
+        Names of the dropped (or, with dry_run, droppable) partitions.
+    """
+    cutoff_month = month_start(cutoff)
+    dropped = []
+    for name, month in list_partitions(conn):
+        if month < cutoff_month:
+            if not dry_run:
+                conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    return dropped
+
+
+def is_partitioned(conn: Connection) -> bool:
+    """True if access_audit_log exists as a partitioned table."""
+    relkind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :parent"), {"parent": PARENT}
+    ).scalar()
+    return relkind == "p"
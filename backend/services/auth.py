@@ -1,13 +1,28 @@
 """
 Authentication service — JWT token creation and validation.
+
+Two token formats:
+- default: only `sub`; authenticate() rebuilds the context from PostgreSQL
+  (cached per user_id).
+- JWT_EMBED_CLAIMS=true: the token also carries email, department, roles and
+  the user's role_version (`rv`). authenticate() builds the context from the
+  claims and only checks `rv` against the (cached) current role_version, so
+  role changes revoke outstanding tokens.
 """
 import jwt
 from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass
 
-from backend.config import JWT_SECRET, JWT_ALGORITHM
-from backend.database import SessionLocal
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, joinedload
+
+from backend.config import (
+    JWT_SECRET, JWT_ALGORITHM, JWT_EMBED_CLAIMS, ROLE_VERSION_TTL_S,
+    USER_CONTEXT_CACHE_SIZE, USER_CONTEXT_TTL_S,
+)
+from backend.database import session_scope
 from backend.models import User
+from backend.services.cache import TTLCache
 
 
 @dataclass
@@ -17,47 +32,163 @@ class UserContext:
     email: str
     department: str
     roles: list[str]
+    role_version: int = 1
+
+
+# ── User context cache ──
+# Roles change rarely; the TTL bounds staleness for changes made by other
+# processes (e.g. scripts/init_db.py), in-process changes call the hooks below.
+_user_cache = TTLCache(maxsize=USER_CONTEXT_CACHE_SIZE, ttl=USER_CONTEXT_TTL_S)
+
+# Current role_version per user_id, for validating claims-carrying tokens
+_role_version_cache = TTLCache(maxsize=USER_CONTEXT_CACHE_SIZE, ttl=ROLE_VERSION_TTL_S)
 
 
-def create_token(user_id: str) -> str:
-    """Create a JWT token for the given user."""
+def create_token(user_id: str, ctx: UserContext | None = None) -> str:
+    """
+    Create a JWT token for the given user.
+
+    Args:
+        user_id: The user's ID (`sub` claim).
+        ctx: The user's context. Embedded in the token when JWT_EMBED_CLAIMS is on.
+    """
     payload = {
         "sub": user_id,
         "iat": datetime.now(timezone.utc),
         "exp": datetime.now(timezone.utc) + timedelta(hours=24),
     }
+    if JWT_EMBED_CLAIMS and ctx is not None:
+        payload.update({
+            "email": ctx.email,
+            "dept": ctx.department,
+            "roles": ctx.roles,
+            "rv": ctx.role_version,
+        })
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
 def decode_token(token: str) -> str:
     """Decode a JWT token and return the user_id."""
-    payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-    return payload["sub"]
+    return decode_token_claims(token)["sub"]
 
 
-def get_user_context(user_id: str) -> UserContext | None:
-    """Look up user in DB and return their context."""
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.user_id == user_id).first()
+def decode_token_claims(token: str) -> dict:
+    """Decode and verify a JWT token, returning all claims."""
+    return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+
+
+def get_user_context(user_id: str, db: Session | None = None) -> UserContext | None:
+    """
+    Return the user's context, from cache or a single eager-loaded DB query.
+
+    Args:
+        user_id: The user's ID.
+        db: The request's session (from get_db); a short-lived one is opened if omitted.
+    """
+    ctx = _user_cache.get(user_id)
+    if ctx is not None:
+        return ctx
+
+    with session_scope(db) as db:
+        user = (
+            db.query(User)
+            .options(joinedload(User.roles))
+            .filter(User.user_id == user_id)
+            .first()
+        )
         if not user:
             return None
-        return UserContext(
-            user_id=user.user_id,
-            email=user.email,
-            department=user.department,
-            roles=user.role_names(),
-        )
-    finally:
-        db.close()
+        return cache_user_context(user)
+
+
+def cache_user_context(user: User) -> UserContext:
+    """Build a UserContext from a loaded User (roles included) and cache it."""
+    ctx = UserContext(
+        user_id=user.user_id,
+        email=user.email,
+        department=user.department,
+        roles=user.role_names(),
+        role_version=user.role_version or 1,
+    )
+    _user_cache.set(user.user_id, ctx)
+    _role_version_cache.set(user.user_id, ctx.role_version)
+    return ctx
+
+
+def current_role_version(user_id: str, db: Session | None = None) -> int | None:
+    """The user's role_version (None if the user no longer exists), cached briefly."""
+    version = _role_version_cache.get(user_id)
+    if version is not None:
+        return version
 
+    with session_scope(db) as db:
+        version = db.query(User.role_version).filter(User.user_id == user_id).scalar()
+    if version is not None:
+        _role_version_cache.set(user_id, version)
+    return version
 
-def authenticate(token: str) -> UserContext | None:
-    """Validate token and return user context."""
+
+def invalidate_user_context(user_id: str):
+    """Drop a cached context — call after changing the user's roles or department."""
+    _user_cache.invalidate(user_id)
+    _role_version_cache.invalidate(user_id)
+
+
+def clear_user_context_cache():
+    """Drop every cached context — call after bulk role changes."""
+    _user_cache.clear()
+    _role_version_cache.clear()
+
+
+def user_context_cache_stats() -> dict:
+    return _user_cache.stats()
+
+
+# In-process role/department edits made through the ORM invalidate automatically
+@event.listens_for(User.roles, "append")
+@event.listens_for(User.roles, "remove")
+def _on_roles_change(target, *args):
+    _on_user_change(target)
+
+
+@event.listens_for(User.department, "set", active_history=True)
+def _on_department_set(target, value, oldvalue, initiator):
+    if value != oldvalue:
+        _on_user_change(target)
+
+
+def _on_user_change(target: User):
+    # Users still being built (not yet in the database) have no tokens to revoke
+    state = inspect(target)
+    if state.transient or state.pending:
+        return
+    # Revokes claims-carrying tokens issued before the change
+    target.role_version = (target.role_version or 1) + 1
+    if target.user_id:
+        invalidate_user_context(target.user_id)
+
+
+def authenticate(token: str, db: Session | None = None) -> UserContext | None:
+    """Validate token and return user context (using the request's session if given)."""
     try:
-        user_id = decode_token(token)
-        return get_user_context(user_id)
+        claims = decode_token_claims(token)
+        if "rv" in claims:
+            return _context_from_claims(claims, db)
+        return get_user_context(claims["sub"], db)
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+
+
+def _context_from_claims(claims: dict, db: Session | None = None) -> UserContext | None:
+    """Build the context from a claims-carrying token, rejecting it if roles changed since issue."""
+    if current_role_version(claims["sub"], db) != claims["rv"]:
+        return None
+    return UserContext(
+        user_id=claims["sub"],
+        email=claims["email"],
+        department=claims["dept"],
+        roles=list(claims["roles"]),
+        role_version=claims["rv"],
+    )
@@ -0,0 +1,121 @@
+"""
+Micro-batching — coalesces model calls from concurrent requests.
+
+Request threads submit their inputs and block on a Future; a background
+worker gathers everything that arrives within a few milliseconds (up to a
+maximum batch size) into one model call and fans the results back out.
+On CPU a single batched matrix multiply is far cheaper than many small ones.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+
+@dataclass
+class _Job:
+    items: list
+    future: Future = field(default_factory=Future)
+
+
+class MicroBatcher:
+    """
+    Batches `fn(items) -> results` calls across threads.
+
+    `fn` receives the concatenated items of every job in a batch and must
+    return one result per item, in order.
+    """
+
+    def __init__(
+        self,
+        fn,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        num_workers: int = 1,
+        name: str = "batcher",
+    ):
+        self.fn = fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.num_workers = max(1, num_workers)
+        self.name = name
+
+        self._queue: queue.Queue[_Job] = queue.Queue()
+        self._workers: list[threading.Thread] = []
+        self._start_lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, items: list) -> Future:
+        """Queue items for the next batch. The Future resolves to their results."""
+        self._ensure_started()
+        job = _Job(items=list(items))
+        self._queue.put(job)
+        return job.future
+
+    def run(self, items: list) -> list:
+        """Submit items and block until their results are ready."""
+        if not items:
+            return []
+        return self.submit(items).result()
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+    # ── Worker ──
+
+    def _ensure_started(self):
+        if self._workers:
+            return
+        with self._start_lock:
+            if self._workers:
+                return
+            for i in range(self.num_workers):
+                t = threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+                t.start()
+                self._workers.append(t)
+
+    def _collect_batch(self) -> list[_Job]:
+        """Block for the first job, then gather more until full or max_wait elapses."""
+        batch = [self._queue.get()]
+        size = len(batch[0].items)
+        deadline = time.monotonic() + self.max_wait
+
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(job)
+            size += len(job.items)
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = [job for job in self._collect_batch() if job.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            all_items = [item for job in batch for item in job.items]
+            try:
+                results = self.fn(all_items)
+            except Exception as e:
+                for job in batch:
+                    job.future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(all_items)
+
+            offset = 0
+            for job in batch:
+                job.future.set_result(list(results[offset : offset + len(job.items)]))
+                offset += len(job.items)
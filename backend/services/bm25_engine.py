@@ -0,0 +1,365 @@
+"""
+Array-backed BM25 engine — a NumPy alternative to Whoosh for keyword search.
+
+Selected with KEYWORD_ENGINE=numpy. Whoosh stays the write path (ingest,
+incremental deletes); after each ingest its stored fields are compiled into
+a compact inverted index that API processes memory-map and score with NumPy.
+keyword_search() in bm25_index dispatches here, so callers are unchanged.
+
+Layout on disk (KEYWORD_INDEX_DIR):
+    CURRENT                    name of the live generation (gen-<ms timestamp>)
+    gen-*/meta.json            doc count, average field lengths, bitmap keys
+    gen-*/terms.npy            sorted 64-bit term keys (row = term id)
+    gen-*/<field>.indptr.npy   CSR offsets into the field's postings, per term
+    gen-*/<field>.docs.npy     postings: doc numbers, ascending within a term
+    gen-*/<field>.weights.npy  postings: BM25 TF component (length norm applied)
+    gen-*/<field>.idf.npy      IDF per term
+    gen-*/bitmaps.npy          packed doc bitsets per (access_roles|department|
+                               classification, value)
+    gen-*/docs.bin             stored fields, one JSON record per doc
+    gen-*/docs.offsets.npy     record offsets into docs.bin
+
+Each build keeps the previous generation on disk so a reader that read
+CURRENT just before the swap can still map it.
+
+Scoring matches the Whoosh searcher: the query is analyzed like Whoosh's
+StandardAnalyzer, every term must occur in `text` or `doc_title` (the
+parser's default AND group), and BM25F scores (Whoosh's IDF, K1=1.2,
+B=0.75) are summed over both fields. Parser syntax (phrases, field:value,
+OR/NOT) is not supported; the query is treated as a bag of terms.
+"""
+import hashlib
+import json
+import shutil
+import threading
+import time
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+from whoosh.util.numeric import byte_to_length, length_to_byte
+
+from backend.config import KEYWORD_INDEX_DIR, BM25_REFRESH_INTERVAL_S
+from backend.services.chunker import chunk_index_from_id
+from backend.services.permissions import access_roles_for
+from backend.services.sparse_encoder import tokenize
+
+FIELDS = ("text", "doc_title")
+BITMAP_FIELDS = ("access_roles", "department", "classification")
+STORED_FIELDS = ("text", "chunk_id", "doc_id", "doc_title", "department", "classification", "content_hash")
+
+# whoosh.scoring.BM25F defaults
+_K1 = 1.2
+_B = 0.75
+
+_FILTER_CACHE_MAX = 256
+
+
+def term_key(token: str) -> int:
+    """64-bit term key; collisions are negligible at any realistic vocabulary size."""
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+# ── Build ──
+
+def build_keyword_index(stored_docs: Iterable[dict], path: Path = KEYWORD_INDEX_DIR) -> int:
+    """
+    Compile stored chunk fields (e.g. Whoosh's all_stored_fields()) into a
+    new generation and make it current.
+
+    Returns:
+        Number of indexed chunks.
+    """
+    generation = f"gen-{int(time.time() * 1000):013d}"
+    gen_dir = path / generation
+    gen_dir.mkdir(parents=True, exist_ok=True)
+
+    term_ids: dict[str, int] = {}
+    postings = {f: (array("q"), array("q"), array("I")) for f in FIELDS}  # term, doc, tf
+    lengths = {f: array("I") for f in FIELDS}
+    bitmap_docs: dict[tuple[str, str], array] = {}
+    offsets = array("q", [0])
+
+    with open(gen_dir / "docs.bin", "wb") as store:
+        for docnum, fields in enumerate(stored_docs):
+            record = {name: fields.get(name) for name in STORED_FIELDS}
+            record["doc_title"] = str(record["doc_title"])
+            record["classification"] = record["classification"] or "public"
+            data = json.dumps(record, ensure_ascii=False).encode("utf-8")
+            store.write(data)
+            offsets.append(offsets[-1] + len(data))
+
+            for field in FIELDS:
+                tokens = tokenize(record[field] or "")
+                lengths[field].append(len(tokens))
+                terms, docs, tfs = postings[field]
+                for token, tf in Counter(tokens).items():
+                    terms.append(term_ids.setdefault(token, len(term_ids)))
+                    docs.append(docnum)
+                    tfs.append(tf)
+
+            facets = {
+                "access_roles": access_roles_for(record["department"], record["classification"]),
+                "department": [record["department"]],
+                "classification": [record["classification"]],
+            }
+            for field, values in facets.items():
+                for value in values:
+                    bitmap_docs.setdefault((field, value), array("q")).append(docnum)
+
+    n = len(offsets) - 1
+    np.save(gen_dir / "docs.offsets.npy", np.frombuffer(offsets, dtype=np.int64))
+
+    # Term ids ordered by key, so lookups are a binary search over terms.npy
+    keys = np.fromiter((term_key(t) for t in term_ids), dtype=np.uint64, count=len(term_ids))
+    order = np.argsort(keys, kind="stable")
+    row_of = np.empty(len(keys), dtype=np.int64)
+    row_of[order] = np.arange(len(keys))
+    np.save(gen_dir / "terms.npy", keys[order])
+
+    avg_lengths = {}
+    for field in FIELDS:
+        terms, docs, tfs = postings[field]
+        terms, docs = np.frombuffer(terms, dtype=np.int64), np.frombuffer(docs, dtype=np.int64)
+        tfs = np.frombuffer(tfs, dtype=np.uint32)
+        field_lengths = np.frombuffer(lengths[field], dtype=np.uint32).astype(np.float64)
+        avg = float(field_lengths.mean()) if n else 0.0
+        avg_lengths[field] = avg
+
+        rows = row_of[terms]
+        by_term = np.argsort(rows, kind="stable")  # docs stay ascending within a term
+        docs, tfs = docs[by_term], tfs[by_term].astype(np.float64)
+        df = np.bincount(rows, minlength=len(keys))
+        indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(df, out=indptr[1:])
+
+        norms = _K1 * (1 - _B + _B * _stored_lengths(field_lengths) / (avg or 1))
+        weights = tfs * (_K1 + 1) / (tfs + norms[docs])
+        idf = np.log(max(n, 1) / (df + 1)) + 1  # whoosh WeightingModel.idf
+
+        np.save(gen_dir / f"{field}.indptr.npy", indptr)
+        np.save(gen_dir / f"{field}.docs.npy", docs.astype(np.int32))
+        np.save(gen_dir / f"{field}.weights.npy", weights.astype(np.float32))
+        np.save(gen_dir / f"{field}.idf.npy", idf.astype(np.float32))
+
+    bitmap_keys = sorted(bitmap_docs)
+    bitmaps = np.zeros((len(bitmap_keys), (n + 7) // 8), dtype=np.uint8)
+    for i, key in enumerate(bitmap_keys):
+        mask = np.zeros(n, dtype=bool)
+        mask[np.frombuffer(bitmap_docs[key], dtype=np.int64)] = True
+        bitmaps[i] = np.packbits(mask)
+    np.save(gen_dir / "bitmaps.npy", bitmaps)
+
+    (gen_dir / "meta.json").write_text(json.dumps({
+        "doc_count": n,
+        "avg_lengths": avg_lengths,
+        "bitmap_keys": [list(key) for key in bitmap_keys],
+    }))
+
+    current = path / "CURRENT"
+    previous = current.read_text().strip() if current.exists() else None
+    tmp = path / "CURRENT.tmp"
+    tmp.write_text(generation)
+    tmp.replace(current)
+
+    # Keep the previous generation for readers that read CURRENT just
+    # before the swap; mapped files stay alive after unlink anyway
+    for old in path.glob("gen-*"):
+        if old.name not in (generation, previous):
+            shutil.rmtree(old, ignore_errors=True)
+    print(f"  Built keyword index: {n} chunks, {len(keys)} terms ({generation})")
+    return n
+
+
+def _stored_lengths(lengths: np.ndarray) -> np.ndarray:
+    """Field lengths as Whoosh scores them (stored as one lossy byte per doc)."""
+    distinct, inverse = np.unique(lengths, return_inverse=True)
+    quantized = np.array([byte_to_length(length_to_byte(int(v))) for v in distinct], dtype=np.float64)
+    return quantized[inverse]
+
+
+# ── Search ──
+
+class KeywordIndex:
+    """One memory-mapped generation of the keyword index (read-only)."""
+
+    def __init__(self, gen_dir: Path):
+        self.generation = gen_dir.name
+        meta = json.loads((gen_dir / "meta.json").read_text())
+        self.doc_count = meta["doc_count"]
+        self.terms = np.load(gen_dir / "terms.npy", mmap_mode="r")
+        self.postings = {
+            field: tuple(
+                np.load(gen_dir / f"{field}.{part}.npy", mmap_mode="r")
+                for part in ("indptr", "docs", "weights", "idf")
+            )
+            for field in FIELDS
+        }
+        self.bitmap_rows = {tuple(key): i for i, key in enumerate(meta["bitmap_keys"])}
+        self.bitmaps = np.load(gen_dir / "bitmaps.npy", mmap_mode="r")
+        self.offsets = np.load(gen_dir / "docs.offsets.npy", mmap_mode="r")
+        self.store = np.memmap(gen_dir / "docs.bin", dtype=np.uint8, mode="r") if self.offsets[-1] else None
+
+        # Allowed-doc masks per (roles, department, classification)
+        self._filter_cache: dict[tuple, np.ndarray | None] = {}
+        self._filter_lock = threading.Lock()
+
+    def search(
+        self,
+        query: str,
+        allowed_roles: list[str] | None = None,
+        department_filter: str | None = None,
+        top_k: int = 20,
+        classification_filter: str | None = None,
+    ) -> list[dict]:
+        """Top-k chunks containing every query term, in keyword_search()'s result format."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        n = self.doc_count
+        if not tokens or not n:
+            return []
+
+        scores = np.zeros(n, dtype=np.float32)
+        hits = None
+        for token in tokens:
+            row = self._term_row(token)
+            if row is None:
+                return []  # AND semantics: an unknown term matches nothing
+            matched = np.zeros(n, dtype=bool)
+            for indptr, docs, weights, idf in self.postings.values():
+                start, end = indptr[row], indptr[row + 1]
+                if start == end:
+                    continue
+                term_docs = docs[start:end]
+                scores[term_docs] += idf[row] * weights[start:end]  # docs are unique within a term
+                matched[term_docs] = True
+            hits = matched if hits is None else hits & matched
+
+        allowed = self._filter_mask(allowed_roles, department_filter, classification_filter)
+        if allowed is not None:
+            hits &= allowed
+        candidates = np.flatnonzero(hits)
+        if not candidates.size:
+            return []
+
+        candidate_scores = scores[candidates]
+        k = min(top_k, candidates.size)
+        top = np.argpartition(-candidate_scores, k - 1)[:k]
+        top = top[np.lexsort((candidates[top], -candidate_scores[top]))]  # ties by docnum, like Whoosh
+        return [self._result(int(candidates[i]), float(candidate_scores[i])) for i in top]
+
+    def stats(self) -> dict:
+        return {"chunks": self.doc_count, "terms": len(self.terms), "generation": self.generation}
+
+    def _term_row(self, token: str) -> int | None:
+        key = np.uint64(term_key(token))
+        row = int(np.searchsorted(self.terms, key))
+        return row if row < len(self.terms) and self.terms[row] == key else None
+
+    def _filter_mask(
+        self,
+        allowed_roles: list[str] | None,
+        department_filter: str | None,
+        classification_filter: str | None,
+    ) -> np.ndarray | None:
+        """Docs the caller may see (None = no restriction), cached per filter."""
+        if allowed_roles is None and not department_filter and not classification_filter:
+            return None
+        key = (
+            frozenset(allowed_roles) if allowed_roles is not None else None,
+            department_filter,
+            classification_filter,
+        )
+        with self._filter_lock:
+            if key in self._filter_cache:
+                return self._filter_cache[key]
+
+        packed = np.full(self.bitmaps.shape[1], 0xFF, dtype=np.uint8)
+        if allowed_roles is not None:
+            packed &= self._union("access_roles", allowed_roles)
+        if department_filter:
+            packed &= self._union("department", [department_filter])
+        if classification_filter:
+            packed &= self._union("classification", [classification_filter])
+        mask = np.unpackbits(packed, count=self.doc_count).astype(bool)
+
+        with self._filter_lock:
+            if len(self._filter_cache) >= _FILTER_CACHE_MAX:
+                self._filter_cache.clear()
+            self._filter_cache[key] = mask
+        return mask
+
+    def _union(self, field: str, values: list[str]) -> np.ndarray:
+        packed = np.zeros(self.bitmaps.shape[1], dtype=np.uint8)
+        for value in values:
+            row = self.bitmap_rows.get((field, value))
+            if row is not None:
+                packed |= self.bitmaps[row]
+        return packed
+
+    def _result(self, docnum: int, score: float) -> dict:
+        record = json.loads(bytes(self.store[self.offsets[docnum] : self.offsets[docnum + 1]]))
+        return {
+            "text": record["text"],
+            "chunk_id": record["chunk_id"],
+            "doc_id": record["doc_id"],
+            "doc_title": record["doc_title"],
+            "department": record["department"],
+            "classification": record["classification"],
+            "chunk_index": chunk_index_from_id(record["chunk_id"]),
+            "content_hash": record["content_hash"],
+            "score": score,
+            "source": "bm25",
+        }
+
+
+# ── Cached index (shared by all queries in this process) ──
+_index: KeywordIndex | None = None
+_generation: str | None = None
+_last_refresh_check = float("-inf")
+_index_lock = threading.Lock()
+
+
+def get_keyword_index(path: Path = KEYWORD_INDEX_DIR) -> KeywordIndex | None:
+    """
+    Return the live generation, or None if none has been built yet.
+
+    CURRENT is re-read at most every BM25_REFRESH_INTERVAL_S; a new
+    generation is mapped and swapped in while in-flight queries finish on
+    the old one. If a rebuild removed the generation just read, CURRENT is
+    re-read once; a failed refresh keeps the mapped generation and is
+    retried on the next call.
+    """
+    global _index, _generation, _last_refresh_check
+    with _index_lock:
+        now = time.monotonic()
+        if now - _last_refresh_check < BM25_REFRESH_INTERVAL_S:
+            return _index
+        current = path / "CURRENT"
+        for attempt in range(2):
+            generation = current.read_text().strip() if current.exists() else None
+            if generation == _generation:
+                break
+            try:
+                _index = KeywordIndex(path / generation) if generation else None
+                _generation = generation
+                break
+            except FileNotFoundError as e:
+                if attempt == 0:
+                    continue
+                if _index is None:
+                    raise
+                print(f"  ⚠ Keyword index refresh failed, keeping {_generation}: {e}")
+                return _index
+        _last_refresh_check = now
+        return _index
+
+
+def reset_keyword_index():
+    """Drop the cached generation (e.g. after a rebuild in this process)."""
+    global _index, _generation, _last_refresh_check
+    with _index_lock:
+        _index = None
+        _generation = None
+        _last_refresh_check = float("-inf")
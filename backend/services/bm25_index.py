@@ -1,13 +1,24 @@
 """
 BM25 keyword search using Whoosh.
 """
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 from pathlib import Path
 from whoosh.index import create_in, open_dir, exists_in
-from whoosh.fields import Schema, TEXT, ID
+from whoosh.fields import Schema, TEXT, ID, KEYWORD
 from whoosh.qparser import MultifieldParser
+from whoosh.query import And, Or, Term
 from whoosh import scoring
 
-from backend.config import BM25_INDEX_DIR
+from backend.config import (
+    BM25_INDEX_DIR, BM25_WRITER_PROCS, BM25_WRITER_LIMITMB, BM25_WRITER_MULTISEGMENT,
+    BM25_REFRESH_INTERVAL_S, KEYWORD_ENGINE,
+)
+from backend.services import bm25_engine
+from backend.services.chunker import make_chunk_id, chunk_index_from_id, content_hash
+from backend.services.permissions import access_roles_for
 
 
 # ── Whoosh Schema ──
@@ -18,8 +29,23 @@ SCHEMA = Schema(
     department=ID(stored=True),
     classification=ID(stored=True),
     text=TEXT(stored=True),
+    content_hash=ID(stored=True),
+    access_roles=KEYWORD(commas=True),  # mirrors the Qdrant payload; used for filtering
 )
 
+# ── Cached searcher + parser (shared by all queries in this process) ──
+_searcher = None
+_parser = None
+_searcher_identity = None
+_last_refresh_check = 0.0
+_searcher_lock = threading.Lock()
+_searcher_users: dict = {}  # searcher -> queries in flight
+_retired: set = set()       # replaced searchers waiting for their last query
+
+# Allowed docnums per (roles, department), cached per searcher generation
+_filter_cache = weakref.WeakKeyDictionary()
+_FILTER_CACHE_MAX = 256
+
 
 def ensure_index_dir():
     """Create the index directory if it doesn't exist."""
@@ -31,6 +57,7 @@ def create_bm25_index():
     ensure_index_dir()
     ix = create_in(str(BM25_INDEX_DIR), SCHEMA)
     print(f"  Created BM25 index at: {BM25_INDEX_DIR}")
+    reset_searcher()
     return ix
 
 
@@ -42,6 +69,14 @@ def get_bm25_index():
     return create_bm25_index()
 
 
+def bm25_schema_is_current() -> bool:
+    """Return True if an index exists on disk and was built with the current SCHEMA."""
+    if not exists_in(str(BM25_INDEX_DIR)):
+        return False
+    ix = open_dir(str(BM25_INDEX_DIR))
+    return set(ix.schema.names()) == set(SCHEMA.names())
+
+
 def index_chunks(
     chunks: list[str],
     doc_id: str,
@@ -50,27 +85,231 @@ def index_chunks(
     classification: str,
 ) -> int:
     """
-    Index text chunks into BM25.
+    Index text chunks into BM25, replacing any previous chunks of the document.
+
+    Opens and commits a writer per call — use BulkIndexer when indexing many
+    documents.
 
     Returns:
         Number of chunks indexed.
     """
-    ix = get_bm25_index()
-    writer = ix.writer()
+    with BulkIndexer(optimize=False) as indexer:
+        return indexer.add_chunks(chunks, doc_id, doc_title, department, classification)
+
+
+def delete_document_chunks(doc_id: str) -> int:
+    """
+    Remove all chunks of a document from the BM25 index.
+
+    Returns:
+        Number of chunks deleted.
+    """
+    with BulkIndexer(optimize=False) as indexer:
+        return indexer.delete_document(doc_id)
+
+
+class BulkIndexer:
+    """
+    Single Whoosh writer kept open across a whole ingestion run.
 
-    for i, chunk_text in enumerate(chunks):
-        chunk_id = f"{doc_id}_chunk_{i}"
-        writer.update_document(
-            chunk_id=chunk_id,
-            doc_id=doc_id,
-            doc_title=doc_title,
-            department=department,
-            classification=classification,
-            text=chunk_text,
-        )
+    Committing once (instead of once per document) writes one segment rather
+    than thousands, and optimizing at the end leaves a single merged segment
+    for fast searching.
 
-    writer.commit()
-    return len(chunks)
+    Usage:
+        with BulkIndexer() as indexer:
+            indexer.add_chunks(...)
+        # committed (and optimized) on exit, cancelled on exception
+    """
+
+    def __init__(
+        self,
+        procs: int = BM25_WRITER_PROCS,
+        limitmb: int = BM25_WRITER_LIMITMB,
+        multisegment: bool = BM25_WRITER_MULTISEGMENT,
+        optimize: bool = True,
+    ):
+        self.optimize = optimize
+        ix = get_bm25_index()
+        if procs > 1:
+            # Whoosh's multiprocess writer: sub-writers index in parallel and
+            # are merged on commit (or kept as separate segments if multisegment).
+            self._writer = ix.writer(procs=procs, limitmb=limitmb, multisegment=multisegment)
+        else:
+            self._writer = ix.writer(limitmb=limitmb)
+
+    def add_chunks(
+        self,
+        chunks: list[str],
+        doc_id: str,
+        doc_title: str,
+        department: str,
+        classification: str,
+    ) -> int:
+        """
+        Add a document's chunks, replacing any previous version of it.
+
+        Returns:
+            Number of chunks indexed.
+        """
+        # Drop the old version first so chunks removed from the document disappear
+        self._writer.delete_by_term("doc_id", doc_id)
+
+        access_roles = ",".join(access_roles_for(department, classification))
+        for i, chunk_text in enumerate(chunks):
+            self._writer.add_document(
+                chunk_id=make_chunk_id(doc_id, i),
+                doc_id=doc_id,
+                doc_title=doc_title,
+                department=department,
+                classification=classification,
+                text=chunk_text,
+                content_hash=content_hash(chunk_text),
+                access_roles=access_roles,
+            )
+        return len(chunks)
+
+    def delete_document(self, doc_id: str) -> int:
+        """Remove all chunks of a document. Returns the number deleted."""
+        return self._writer.delete_by_term("doc_id", doc_id)
+
+    def commit(self):
+        """Commit everything written so far as one segment (optimized if requested)."""
+        self._writer.commit(optimize=self.optimize)
+
+    def cancel(self):
+        """Discard everything written since the writer was opened."""
+        self._writer.cancel()
+
+    def __enter__(self) -> "BulkIndexer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.cancel()
+        return False
+
+
+def _index_identity(ix) -> tuple:
+    """
+    Generation plus segment ids of the index's current TOC. `create_in`
+    (ingest --full) restarts the generation count, so the generation alone
+    can't tell a rebuilt index from the one a searcher has open.
+    """
+    toc = ix._read_toc()
+    return toc.generation, tuple(seg.segment_id() for seg in toc.segments)
+
+
+def get_searcher():
+    """
+    Return the process-wide (searcher, parser) pair.
+
+    The searcher is opened once and only replaced when the index changes
+    (checked at most every BM25_REFRESH_INTERVAL_S), so queries don't re-read
+    the TOC and segment files on every request. Use `_searcher_in_use()` for
+    queries so a replaced searcher is closed once its last query finishes.
+    """
+    global _searcher, _parser, _searcher_identity, _last_refresh_check
+    with _searcher_lock:
+        now = time.monotonic()
+        if _searcher is not None and now - _last_refresh_check < BM25_REFRESH_INTERVAL_S:
+            return _searcher, _parser
+        _last_refresh_check = now
+
+        ix = get_bm25_index()
+        try:
+            identity = _index_identity(ix)
+        except Exception as e:
+            # e.g. a TOC swapped mid-read; keep serving the current searcher
+            if _searcher is not None:
+                print(f"  ⚠ Could not check BM25 index for changes: {e}")
+                return _searcher, _parser
+            identity = None
+        if _searcher is None or identity != _searcher_identity:
+            if _searcher is not None:
+                _retire(_searcher)
+            _searcher = ix.searcher(weighting=scoring.BM25F())
+            _parser = MultifieldParser(["text", "doc_title"], schema=ix.schema)
+            _searcher_identity = identity
+        return _searcher, _parser
+
+
+@contextmanager
+def _searcher_in_use():
+    """(searcher, parser) for one query, counted so a superseded searcher can be closed."""
+    searcher, parser = get_searcher()
+    with _searcher_lock:
+        _searcher_users[searcher] = _searcher_users.get(searcher, 0) + 1
+    try:
+        yield searcher, parser
+    finally:
+        with _searcher_lock:
+            _searcher_users[searcher] -= 1
+            if not _searcher_users[searcher]:
+                del _searcher_users[searcher]
+                if searcher in _retired:
+                    _retired.discard(searcher)
+                    searcher.close()
+
+
+def _retire(searcher):
+    """Close a replaced searcher now, or after its in-flight queries (lock held)."""
+    if _searcher_users.get(searcher):
+        _retired.add(searcher)
+    else:
+        searcher.close()
+
+
+def reset_searcher():
+    """Drop the cached searcher (e.g. after the index was recreated)."""
+    global _searcher, _parser, _searcher_identity
+    with _searcher_lock:
+        if _searcher is not None:
+            _retire(_searcher)
+        _searcher = None
+        _parser = None
+        _searcher_identity = None
+
+
+def _filter_docs(
+    searcher,
+    allowed_roles: list[str] | None,
+    department_filter: str | None,
+    classification_filter: str | None = None,
+) -> set[int] | None:
+    """
+    Docnums the caller may see, passed to Whoosh as `filter=` so restricted
+    chunks are excluded during scoring rather than dropped afterwards.
+
+    The set is computed once per (roles, facets) and searcher generation.
+    """
+    terms = []
+    if allowed_roles is not None:
+        terms.append(Or([Term("access_roles", role) for role in allowed_roles]))
+    if department_filter:
+        terms.append(Term("department", department_filter))
+    if classification_filter:
+        terms.append(Term("classification", classification_filter))
+    if not terms:
+        return None
+
+    key = (
+        frozenset(allowed_roles) if allowed_roles is not None else None,
+        department_filter,
+        classification_filter,
+    )
+    with _searcher_lock:
+        cache = _filter_cache.setdefault(searcher, {})
+        docs = cache.get(key)
+    if docs is None:
+        docs = set(searcher.docs_for_query(And(terms)))
+        with _searcher_lock:
+            if len(cache) >= _FILTER_CACHE_MAX:
+                cache.clear()
+            cache[key] = docs
+    return docs
 
 
 def keyword_search(
@@ -78,40 +317,70 @@ def keyword_search(
     allowed_roles: list[str] | None = None,
     department_filter: str | None = None,
     top_k: int = 20,
+    classification_filter: str | None = None,
 ) -> list[dict]:
     """
     Search BM25 index for keyword matches.
 
-    Permission filtering is done post-retrieval since Whoosh doesn't support
-    complex role-based filters natively.
+    Args:
+        query: The user's search query.
+        allowed_roles: Only return chunks whose access_roles include one of
+            these roles. None means unrestricted (Admin).
+        department_filter: Only return chunks from this department.
+        top_k: Number of results to return.
+        classification_filter: Only return chunks with this classification.
 
     Returns:
         List of dicts with text, doc_id, doc_title, department, score.
     """
-    ix = get_bm25_index()
-    parser = MultifieldParser(["text", "doc_title"], schema=ix.schema)
-    parsed_query = parser.parse(query)
-
-    results = []
-    with ix.searcher(weighting=scoring.BM25F()) as searcher:
-        hits = searcher.search(parsed_query, limit=top_k * 2)  # over-fetch for filtering
-
-        for hit in hits:
-            # Department filter
-            if department_filter and hit["department"] != department_filter:
-                continue
-
-            results.append({
-                "text": hit["text"],
-                "doc_id": hit["doc_id"],
-                "doc_title": str(hit["doc_title"]),
-                "department": hit["department"],
-                "classification": hit.get("classification", "public"),
-                "score": hit.score,
-                "source": "bm25",
-            })
-
-            if len(results) >= top_k:
-                break
-
-    return results
+    if KEYWORD_ENGINE == "numpy":
+        index = bm25_engine.get_keyword_index()
+        if index is not None:
+            return index.search(query, allowed_roles, department_filter, top_k, classification_filter)
+        _warn_missing_keyword_index()
+
+    with _searcher_in_use() as (searcher, parser):
+        parsed_query = parser.parse(query)
+
+        allowed_docs = _filter_docs(searcher, allowed_roles, department_filter, classification_filter)
+        if allowed_docs is not None and not allowed_docs:
+            return []  # Whoosh treats an empty filter set as "no filter"
+        hits = searcher.search(parsed_query, limit=top_k, filter=allowed_docs)
+        return _hits_to_results(hits)
+
+
+def _hits_to_results(hits) -> list[dict]:
+    """Read the stored fields while the searcher is still open."""
+    return [
+        {
+            "text": hit["text"],
+            "chunk_id": hit["chunk_id"],
+            "doc_id": hit["doc_id"],
+            "doc_title": str(hit["doc_title"]),
+            "department": hit["department"],
+            "classification": hit.get("classification", "public"),
+            "chunk_index": chunk_index_from_id(hit["chunk_id"]),
+            "content_hash": hit.get("content_hash"),
+            "score": hit.score,
+            "source": "bm25",
+        }
+        for hit in hits
+    ]
+
+
+_keyword_index_warned = False
+
+
+def _warn_missing_keyword_index():
+    global _keyword_index_warned
+    if not _keyword_index_warned:
+        _keyword_index_warned = True
+        print("  ⚠ KEYWORD_ENGINE=numpy but no keyword index was built yet — using Whoosh. Run scripts/ingest.py.")
+
+
+def rebuild_keyword_index() -> int:
+    """Compile the committed Whoosh index into the KEYWORD_ENGINE=numpy index."""
+    with get_bm25_index().searcher() as searcher:
+        n = bm25_engine.build_keyword_index(searcher.all_stored_fields())
+    bm25_engine.reset_keyword_index()
+    return n
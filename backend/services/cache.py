@@ -0,0 +1,120 @@
+"""
+In-process caching — thread-safe LRU cache with TTL and hit/miss counters.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after `ttl` seconds.
+
+    Safe to share between request threads. Expiry uses wall-clock time so
+    entries keep their age when the cache is saved to and loaded from disk.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Return the cached value (marking it recently used) or `default`."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Insert or replace a value, evicting the least recently used entry if full."""
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Remove a single entry if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate) -> int:
+        """Remove every entry whose (key, value) satisfies `predicate`. Returns the count."""
+        with self._lock:
+            stale = [k for k, (_, v) in self._data.items() if predicate(k, v)]
+            for k in stale:
+                del self._data[k]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Size and hit/miss counters, for the metrics endpoint."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def save(self, path: Path, tag: str = ""):
+        """Persist live entries to `path`. `tag` must match on load (e.g. a model name)."""
+        now = time.time()
+        with self._lock:
+            entries = [
+                (k, expires_at, v) for k, (expires_at, v) in self._data.items()
+                if expires_at is None or expires_at > now
+            ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"tag": tag, "entries": entries}, f)
+        tmp_path.replace(path)
+
+    def load(self, path: Path, tag: str = "") -> int:
+        """
+        Load entries saved by `save()`.
+
+        Returns:
+            Number of entries loaded (0 if the file is missing or its tag differs).
+        """
+        if not path.exists():
+            return 0
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if data.get("tag") != tag:
+            return 0
+
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for key, expires_at, value in data["entries"]:
+                if expires_at is None or expires_at > now:
+                    self._data[key] = (expires_at, value)
+                    loaded += 1
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return loaded
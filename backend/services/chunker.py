@@ -1,6 +1,7 @@
 """
 Text chunker — splits parsed text into overlapping chunks.
 """
+import hashlib
 import re
 
 
@@ -59,3 +60,18 @@ def chunk_document_segments(segments: list[dict], max_tokens: int = 400, overlap
     # Combine all segments into one text block
     full_text = "\n\n".join(seg["text"] for seg in segments)
     return chunk_text(full_text, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+
+def make_chunk_id(doc_id: str, chunk_index: int) -> str:
+    """Stable chunk identifier shared by Qdrant points and BM25 entries."""
+    return f"{doc_id}_chunk_{chunk_index}"
+
+
+def chunk_index_from_id(chunk_id: str) -> int:
+    """Inverse of make_chunk_id: the chunk's position within its document."""
+    return int(chunk_id.rsplit("_chunk_", 1)[1])
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest of a chunk's text, used to detect changed content."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
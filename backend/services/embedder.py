@@ -1,29 +1,70 @@
 """
 Embedding service — encodes text chunks and upserts into Qdrant.
+
+With VECTOR_STORE=embedded the collection, upsert and search functions below
+use the in-process store in backend.services.vector_store instead.
 """
 from sentence_transformers import SentenceTransformer
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, AsyncQdrantClient
 from qdrant_client.models import (
-    Distance, VectorParams, PointStruct, Filter,
-    FieldCondition, MatchValue,
+    Distance, VectorParams, VectorParamsDiff, PointStruct, Filter,
+    FieldCondition, MatchValue, HasIdCondition, FilterSelector,
+    HnswConfigDiff, PayloadSchemaType, SearchParams, QuantizationSearchParams,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType, Disabled,
+    SparseVectorParams, Modifier, Prefetch, FusionQuery, Fusion,
 )
+import asyncio
 import uuid
 
+import numpy as np
+
 from backend.config import (
     QDRANT_HOST, QDRANT_PORT, QDRANT_COLLECTION,
-    EMBEDDING_MODEL, EMBEDDING_DIM,
+    QDRANT_HNSW_M, QDRANT_HNSW_EF_CONSTRUCT, QDRANT_HNSW_EF,
+    QDRANT_ON_DISK_VECTORS, QDRANT_QUANTIZATION, QDRANT_QUANTIZATION_RESCORE,
+    FUSION_STRATEGY, VECTOR_STORE, RETRIEVAL_ENGINE,
+    EMBEDDING_MODEL, EMBEDDING_DIM, INFERENCE_BACKEND,
+    QUERY_CACHE_SIZE, QUERY_CACHE_TTL_S, QUERY_CACHE_PATH,
+    ENCODER_MAX_BATCH_SIZE, ENCODER_MAX_WAIT_MS, INGEST_EMBED_BATCH_SIZE,
 )
+from backend.services.batching import MicroBatcher
+from backend.services.cache import TTLCache
+from backend.services.chunker import make_chunk_id, content_hash
+from backend.services.inference import load_embedding_model
+from backend.services.permissions import access_roles_for
+from backend.services import sparse_encoder
+from backend.services.vector_store import get_embedded_store, payload_to_result
 
 # ── Singletons (loaded once, reused) ──
 _model = None
 _client = None
+_async_client = None
+_has_sparse = None  # whether the collection stores sparse BM25 vectors (checked once)
+
+# ── Query embedding cache: normalized query -> float32 vector ──
+_query_cache = TTLCache(maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL_S)
+
+
+def _encode_queries(queries: list[str]) -> list[np.ndarray]:
+    """Encode a micro-batch of queries collected from concurrent requests."""
+    model = get_embedding_model()
+    return list(model.encode(queries, batch_size=len(queries), show_progress_bar=False))
+
+
+# ── Micro-batching encoder shared by all request threads ──
+_query_batcher = MicroBatcher(
+    _encode_queries,
+    max_batch_size=ENCODER_MAX_BATCH_SIZE,
+    max_wait_ms=ENCODER_MAX_WAIT_MS,
+    name="query-encoder",
+)
 
 
 def get_embedding_model() -> SentenceTransformer:
     global _model
     if _model is None:
-        print(f"  Loading embedding model: {EMBEDDING_MODEL} ...")
-        _model = SentenceTransformer(EMBEDDING_MODEL)
+        print(f"  Loading embedding model: {EMBEDDING_MODEL} ({INFERENCE_BACKEND}) ...")
+        _model = load_embedding_model(EMBEDDING_MODEL)
     return _model
 
 
@@ -34,21 +75,164 @@ def get_qdrant_client() -> QdrantClient:
     return _client
 
 
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """Async client for the request path (created inside the running event loop)."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncQdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+    return _async_client
+
+
+async def close_async_qdrant_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+# ── Collection layout ──
+SPARSE_VECTOR_NAME = "bm25"  # sparse BM25 vectors, next to the unnamed dense vector
+
+# Payload fields used in filters; indexed so filtered HNSW search doesn't scan payloads
+PAYLOAD_INDEXES = {
+    "access_roles": PayloadSchemaType.KEYWORD,
+    "department": PayloadSchemaType.KEYWORD,
+    "classification": PayloadSchemaType.KEYWORD,
+    "doc_id": PayloadSchemaType.KEYWORD,
+    "chunk_index": PayloadSchemaType.INTEGER,
+}
+
+
+def _hnsw_config() -> HnswConfigDiff:
+    return HnswConfigDiff(m=QDRANT_HNSW_M, ef_construct=QDRANT_HNSW_EF_CONSTRUCT)
+
+
+def _quantization_config() -> ScalarQuantization | None:
+    if QDRANT_QUANTIZATION == "none":
+        return None
+    if QDRANT_QUANTIZATION != "int8":
+        raise ValueError(f"Unknown QDRANT_QUANTIZATION {QDRANT_QUANTIZATION!r}; expected 'none' or 'int8'.")
+    # Quantized vectors stay in RAM even when the originals are on disk
+    return ScalarQuantization(
+        scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True),
+    )
+
+
+def _search_params() -> SearchParams | None:
+    """Search-time HNSW ef and quantization rescoring, if configured."""
+    quantization = None
+    if QDRANT_QUANTIZATION != "none":
+        quantization = QuantizationSearchParams(rescore=QDRANT_QUANTIZATION_RESCORE)
+    if not QDRANT_HNSW_EF and quantization is None:
+        return None
+    return SearchParams(hnsw_ef=QDRANT_HNSW_EF or None, quantization=quantization)
+
+
 def ensure_collection():
-    """Create the Qdrant collection if it doesn't exist."""
+    """Create the Qdrant collection if it doesn't exist, and its payload indexes."""
+    if VECTOR_STORE == "embedded":
+        get_embedded_store().ensure()
+        return
     client = get_qdrant_client()
-    collections = [c.name for c in client.get_collections().collections]
-    if QDRANT_COLLECTION not in collections:
+    if not client.collection_exists(QDRANT_COLLECTION):
         client.create_collection(
             collection_name=QDRANT_COLLECTION,
             vectors_config=VectorParams(
                 size=EMBEDDING_DIM,
                 distance=Distance.COSINE,
+                on_disk=QDRANT_ON_DISK_VECTORS,
             ),
+            # Sparse BM25 vectors are only read by the native hybrid engine
+            sparse_vectors_config={
+                SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF),
+            } if RETRIEVAL_ENGINE == "qdrant" else None,
+            hnsw_config=_hnsw_config(),
+            quantization_config=_quantization_config(),
         )
         print(f"  Created Qdrant collection: {QDRANT_COLLECTION}")
     else:
         print(f"  Qdrant collection already exists: {QDRANT_COLLECTION}")
+    ensure_payload_indexes()
+
+
+def ensure_payload_indexes():
+    """Create any missing payload indexes (existing points are indexed in the background)."""
+    client = get_qdrant_client()
+    existing = client.get_collection(QDRANT_COLLECTION).payload_schema
+    for field, schema in PAYLOAD_INDEXES.items():
+        if field not in existing:
+            client.create_payload_index(QDRANT_COLLECTION, field_name=field, field_schema=schema)
+            print(f"  Created payload index: {field} ({schema.value})")
+
+
+def migrate_collection():
+    """
+    Apply the configured HNSW, on-disk and quantization settings and payload
+    indexes to an existing collection, without re-ingesting.
+
+    Qdrant rebuilds the affected segments in the background; search keeps
+    working meanwhile.
+    """
+    if VECTOR_STORE == "embedded":
+        print("  Collection settings apply to Qdrant only; nothing to migrate for the embedded store.")
+        ensure_collection()
+        return
+
+    client = get_qdrant_client()
+    if not client.collection_exists(QDRANT_COLLECTION):
+        ensure_collection()
+        return
+
+    client.update_collection(
+        collection_name=QDRANT_COLLECTION,
+        vectors_config={"": VectorParamsDiff(on_disk=QDRANT_ON_DISK_VECTORS)},
+        hnsw_config=_hnsw_config(),
+        quantization_config=_quantization_config() or Disabled.DISABLED,
+    )
+    print(
+        f"  Updated Qdrant collection {QDRANT_COLLECTION}: m={QDRANT_HNSW_M}, "
+        f"ef_construct={QDRANT_HNSW_EF_CONSTRUCT}, on_disk={QDRANT_ON_DISK_VECTORS}, "
+        f"quantization={QDRANT_QUANTIZATION}"
+    )
+    ensure_payload_indexes()
+
+
+def collection_has_sparse_vectors() -> bool:
+    """True if the collection was created with the sparse BM25 vector (native hybrid mode)."""
+    global _has_sparse
+    if VECTOR_STORE == "embedded":
+        return False
+    if _has_sparse is None:
+        client = get_qdrant_client()
+        if not client.collection_exists(QDRANT_COLLECTION):
+            return False
+        sparse_config = client.get_collection(QDRANT_COLLECTION).config.params.sparse_vectors or {}
+        _has_sparse = SPARSE_VECTOR_NAME in sparse_config
+    return _has_sparse
+
+
+def reset_collection():
+    """Drop and recreate the Qdrant collection (used for full re-ingestion)."""
+    global _has_sparse
+    _has_sparse = None
+    if VECTOR_STORE == "embedded":
+        get_embedded_store().reset()
+        return
+    client = get_qdrant_client()
+    if client.collection_exists(QDRANT_COLLECTION):
+        client.delete_collection(QDRANT_COLLECTION)
+        print(f"  Dropped Qdrant collection: {QDRANT_COLLECTION}")
+    ensure_collection()
+
+
+def chunk_point_id(doc_id: str, chunk_index: int) -> str:
+    """
+    Deterministic Qdrant point ID for a chunk.
+
+    Re-ingesting a document overwrites its existing points instead of
+    accumulating duplicates.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, make_chunk_id(doc_id, chunk_index)))
 
 
 def embed_and_upsert(
@@ -67,38 +251,103 @@ def embed_and_upsert(
     if not chunks:
         return 0
 
+    # Embed all chunks in one batch
+    vectors = embed_texts(chunks)
+
+    points = build_chunk_points(
+        chunks=chunks,
+        vectors=vectors,
+        doc_id=doc_id,
+        doc_title=doc_title,
+        department=department,
+        classification=classification,
+    )
+    upsert_document_points(doc_id, points)
+
+    return len(points)
+
+
+def embed_texts(texts: list[str], batch_size: int = INGEST_EMBED_BATCH_SIZE) -> list[list[float]]:
+    """Encode texts (possibly spanning several documents) in batches of `batch_size`."""
     model = get_embedding_model()
-    client = get_qdrant_client()
+    return model.encode(texts, batch_size=batch_size, show_progress_bar=False).tolist()
 
-    # Embed all chunks in one batch
-    vectors = model.encode(chunks, show_progress_bar=False).tolist()
 
+def build_chunk_points(
+    chunks: list[str],
+    vectors: list[list[float]],
+    doc_id: str,
+    doc_title: str,
+    department: str,
+    classification: str,
+) -> list[PointStruct]:
+    """Build Qdrant points (vector + payload) for a document's chunks."""
     # Build access_roles list based on classification + department
-    if classification == "public":
-        access_roles = ["Employee", "HR", "Engineer", "Sales", "Admin"]
-    else:
-        # restricted: only the department's role + admin
-        access_roles = [department_to_role(department), "Admin"]
+    access_roles = access_roles_for(department, classification)
+    with_sparse = RETRIEVAL_ENGINE == "qdrant" and collection_has_sparse_vectors()
 
-    # Create points
     points = []
     for i, (chunk_text, vector) in enumerate(zip(chunks, vectors)):
-        point_id = str(uuid.uuid4())
+        point_id = chunk_point_id(doc_id, i)
+        if with_sparse:
+            vector = {"": vector, SPARSE_VECTOR_NAME: sparse_encoder.encode_document(chunk_text)}
         points.append(
             PointStruct(
                 id=point_id,
                 vector=vector,
                 payload={
                     "text": chunk_text,
+                    "chunk_id": make_chunk_id(doc_id, i),
                     "doc_id": doc_id,
                     "doc_title": doc_title,
                     "department": department,
                     "classification": classification,
                     "access_roles": access_roles,
                     "chunk_index": i,
+                    "content_hash": content_hash(chunk_text),
                 },
             )
         )
+    return points
+
+
+def existing_chunk_vectors(doc_id: str) -> dict[str, list[float]]:
+    """
+    content_hash -> stored dense vector for a document's current chunks.
+
+    Lets incremental ingest re-embed only the chunks whose text changed.
+    """
+    if VECTOR_STORE == "embedded":
+        return {h: v.tolist() for h, v in get_embedded_store().document_vectors(doc_id).items()}
+    client = get_qdrant_client()
+    if not client.collection_exists(QDRANT_COLLECTION):
+        return {}
+
+    vectors = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=QDRANT_COLLECTION,
+            scroll_filter=Filter(must=[FieldCondition(key="doc_id", match=MatchValue(value=doc_id))]),
+            with_payload=["content_hash"],
+            with_vectors=True,
+            limit=256,
+            offset=offset,
+        )
+        for p in points:
+            vector = p.vector.get("") if isinstance(p.vector, dict) else p.vector
+            if vector is not None and p.payload.get("content_hash"):
+                vectors[p.payload["content_hash"]] = vector
+        if offset is None:
+            return vectors
+
+
+def upsert_document_points(doc_id: str, points: list[PointStruct]):
+    """Upsert all points of one document, then drop its stale points."""
+    if VECTOR_STORE == "embedded":
+        get_embedded_store().upsert(doc_id, points)
+        return
+    client = get_qdrant_client()
 
     # Upsert in batches of 64
     batch_size = 64
@@ -106,17 +355,107 @@ def embed_and_upsert(
         batch = points[start : start + batch_size]
         client.upsert(collection_name=QDRANT_COLLECTION, points=batch)
 
-    return len(points)
+    # Remove points left over from an older, longer version of the document
+    delete_document_points(doc_id, keep_ids=[p.id for p in points])
 
 
-def department_to_role(department: str) -> str:
-    """Map department name to role name."""
-    mapping = {
-        "HR": "HR",
-        "Engineering": "Engineer",
-        "Sales": "Sales",
-    }
-    return mapping.get(department, "Employee")
+def delete_document_points(doc_id: str, keep_ids: list[str] | None = None):
+    """
+    Delete a document's points from Qdrant.
+
+    Args:
+        doc_id: Document whose points should be removed.
+        keep_ids: Point IDs to preserve (the document's current chunks).
+    """
+    if VECTOR_STORE == "embedded":
+        get_embedded_store().delete_document(doc_id, keep_ids)
+        return
+    client = get_qdrant_client()
+    must_not = [HasIdCondition(has_id=keep_ids)] if keep_ids else None
+    client.delete(
+        collection_name=QDRANT_COLLECTION,
+        points_selector=FilterSelector(
+            filter=Filter(
+                must=[FieldCondition(key="doc_id", match=MatchValue(value=doc_id))],
+                must_not=must_not,
+            )
+        ),
+    )
+
+
+def flush_vector_store():
+    """Persist pending writes (embedded store); Qdrant writes are already durable."""
+    if VECTOR_STORE == "embedded":
+        get_embedded_store().flush()
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form used as the cache key.
+
+    all-MiniLM-L6-v2 is uncased, so lowercasing and collapsing whitespace
+    doesn't change the embedding.
+    """
+    return " ".join(query.lower().split())
+
+
+def encode_query(query: str) -> np.ndarray:
+    """
+    Embed a search query.
+
+    Repeated queries are served from the LRU cache; misses go through the
+    micro-batcher so concurrent requests share one `encode` call.
+    """
+    key = normalize_query(query)
+    vector = _query_cache.get(key)
+    if vector is None:
+        vector = np.asarray(_query_batcher.run([key])[0], dtype=np.float32)
+        _query_cache.set(key, vector)
+    return vector
+
+
+async def encode_query_async(query: str) -> np.ndarray:
+    """Async variant of encode_query: awaits the micro-batcher without holding a thread."""
+    key = normalize_query(query)
+    vector = _query_cache.get(key)
+    if vector is None:
+        result = await asyncio.wrap_future(_query_batcher.submit([key]))
+        vector = np.asarray(result[0], dtype=np.float32)
+        _query_cache.set(key, vector)
+    return vector
+
+
+def query_cache_stats() -> dict:
+    return _query_cache.stats()
+
+
+def query_batcher_stats() -> dict:
+    return _query_batcher.stats()
+
+
+def _query_cache_tag() -> str:
+    # Embeddings differ slightly between backends, so don't mix them across restarts
+    return f"{EMBEDDING_MODEL}:{INFERENCE_BACKEND}"
+
+
+def load_query_cache():
+    """Warm the query embedding cache from disk (if QUERY_CACHE_PATH is set)."""
+    if QUERY_CACHE_PATH:
+        try:
+            n = _query_cache.load(QUERY_CACHE_PATH, tag=_query_cache_tag())
+            print(f"  Loaded {n} cached query embeddings from {QUERY_CACHE_PATH}")
+        except Exception as e:
+            print(f"  ⚠ Could not load query embedding cache: {e}")
+
+
+def save_query_cache():
+    """Persist the query embedding cache to disk (if QUERY_CACHE_PATH is set)."""
+    if QUERY_CACHE_PATH:
+        try:
+            _query_cache.save(QUERY_CACHE_PATH, tag=_query_cache_tag())
+            print(f"  Saved {len(_query_cache)} query embeddings to {QUERY_CACHE_PATH}")
+        except Exception as e:
+            print(f"  ⚠ Could not save query embedding cache: {e}")
 
 
 def vector_search(
@@ -130,29 +469,123 @@ def vector_search(
     Returns:
         List of dicts with text, doc_id, doc_title, department, score.
     """
-    model = get_embedding_model()
+    if VECTOR_STORE == "embedded":
+        return get_embedded_store().search(encode_query(query), qdrant_filter, top_k)
+
     client = get_qdrant_client()
 
-    query_vector = model.encode(query).tolist()
+    query_vector = encode_query(query).tolist()
 
     results = client.query_points(
         collection_name=QDRANT_COLLECTION,
         query=query_vector,
         query_filter=qdrant_filter,
+        search_params=_search_params(),
+        limit=top_k,
+        with_payload=True,
+    )
+
+    return _hits_to_results(results.points)
+
+
+async def vector_search_async(
+    query: str,
+    qdrant_filter: Filter | None = None,
+    top_k: int = 20,
+) -> list[dict]:
+    """Async variant of vector_search using AsyncQdrantClient."""
+    if VECTOR_STORE == "embedded":
+        query_vector = await encode_query_async(query)
+        # NumPy releases the GIL for the dot products
+        return await asyncio.to_thread(get_embedded_store().search, query_vector, qdrant_filter, top_k)
+
+    client = get_async_qdrant_client()
+
+    query_vector = (await encode_query_async(query)).tolist()
+
+    results = await client.query_points(
+        collection_name=QDRANT_COLLECTION,
+        query=query_vector,
+        query_filter=qdrant_filter,
+        search_params=_search_params(),
         limit=top_k,
         with_payload=True,
     )
 
-    return [
-        {
-            "text": hit.payload["text"],
-            "doc_id": hit.payload["doc_id"],
-            "doc_title": hit.payload["doc_title"],
-            "department": hit.payload["department"],
-            "classification": hit.payload.get("classification", "public"),
-            "chunk_index": hit.payload.get("chunk_index", 0),
-            "score": hit.score,
-            "source": "vector",
-        }
-        for hit in results.points
-    ]
+    return _hits_to_results(results.points)
+
+
+def native_hybrid_search(
+    query: str,
+    qdrant_filter: Filter | None = None,
+    top_k: int = 20,
+) -> list[dict]:
+    """
+    Dense + sparse BM25 search fused server-side in one Qdrant query.
+
+    Returns:
+        List of result dicts like vector_search, with source "hybrid".
+    """
+    _require_qdrant_store()
+    client = get_qdrant_client()
+    results = client.query_points(
+        collection_name=QDRANT_COLLECTION,
+        **_native_hybrid_request(query, encode_query(query), qdrant_filter, top_k),
+    )
+    return _hits_to_results(results.points, source="hybrid")
+
+
+async def native_hybrid_search_async(
+    query: str,
+    qdrant_filter: Filter | None = None,
+    top_k: int = 20,
+) -> list[dict]:
+    """Async variant of native_hybrid_search using AsyncQdrantClient."""
+    _require_qdrant_store()
+    client = get_async_qdrant_client()
+    results = await client.query_points(
+        collection_name=QDRANT_COLLECTION,
+        **_native_hybrid_request(query, await encode_query_async(query), qdrant_filter, top_k),
+    )
+    return _hits_to_results(results.points, source="hybrid")
+
+
+def _native_hybrid_request(
+    query: str,
+    dense_vector: np.ndarray,
+    qdrant_filter: Filter | None,
+    top_k: int,
+) -> dict:
+    """query_points arguments: one prefetch per vector type, fused by RRF (or DBSF)."""
+    prefetch = [Prefetch(
+        query=dense_vector.tolist(),
+        filter=qdrant_filter,
+        params=_search_params(),
+        limit=top_k,
+    )]
+    sparse_query = sparse_encoder.encode_query(query)
+    if sparse_query.indices:  # e.g. a query made only of stop words
+        prefetch.append(Prefetch(
+            query=sparse_query,
+            using=SPARSE_VECTOR_NAME,
+            filter=qdrant_filter,
+            limit=top_k,
+        ))
+    fusion = Fusion.DBSF if FUSION_STRATEGY == "dbsf" else Fusion.RRF
+    return {
+        "prefetch": prefetch,
+        "query": FusionQuery(fusion=fusion),
+        "query_filter": qdrant_filter,
+        "limit": top_k,
+        "with_payload": True,
+    }
+
+
+def _require_qdrant_store():
+    if VECTOR_STORE != "qdrant":
+        raise RuntimeError("RETRIEVAL_ENGINE=qdrant needs VECTOR_STORE=qdrant (sparse vectors live in Qdrant).")
+
+
+def _hits_to_results(points, source: str = "vector") -> list[dict]:
+    """Convert Qdrant scored points into result dicts."""
+    return [payload_to_result(hit.payload, hit.score, source) for hit in points]
@@ -0,0 +1,94 @@
+"""
+Result fusion — merges ranked lists from the retrieval legs into one list.
+
+Results are identified by their stable chunk_id (shared by Qdrant payloads
+and the BM25 index), so a chunk found by both legs appears once. Each leg's
+scores are turned into per-chunk contributions with NumPy and combined as
+a weighted sum.
+
+Strategies:
+- "rrf"     weighted Reciprocal Rank Fusion: w / (k + rank); ignores raw scores
+- "minmax"  convex combination of min-max normalized scores
+- "dbsf"    Distribution-Based Score Fusion: scores normalized to
+            [mean - 3σ, mean + 3σ] of their leg, clipped to [0, 1]
+"""
+import numpy as np
+
+from backend.config import FUSION_STRATEGY, FUSION_RRF_K
+
+STRATEGIES = ("rrf", "minmax", "dbsf")
+
+
+def fuse(
+    legs: list[list[dict]],
+    weights: list[float],
+    strategy: str = FUSION_STRATEGY,
+    top_k: int = 20,
+    rrf_k: int = FUSION_RRF_K,
+) -> list[dict]:
+    """
+    Fuse ranked result lists.
+
+    Args:
+        legs: One list of result dicts per retrieval leg, best first. Each
+            dict needs `chunk_id` and `score`.
+        weights: Weight per leg (e.g. [alpha, 1 - alpha]).
+        strategy: One of STRATEGIES.
+        top_k: Number of results to return.
+        rrf_k: RRF rank offset.
+
+    Returns:
+        Up to top_k result dicts, best first. The first leg's dict is kept
+        for a chunk found by several legs; its `score` is set to the fused score.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown fusion strategy {strategy!r}; expected one of {STRATEGIES}.")
+
+    # Assign each distinct chunk a column
+    columns: dict[str, int] = {}
+    results: list[dict] = []
+    leg_columns = []
+    for leg in legs:
+        cols = np.empty(len(leg), dtype=np.intp)
+        for i, r in enumerate(leg):
+            col = columns.get(r["chunk_id"])
+            if col is None:
+                col = columns[r["chunk_id"]] = len(results)
+                results.append(r)
+            cols[i] = col
+        leg_columns.append(cols)
+
+    if not results:
+        return []
+
+    # Weighted per-leg contributions, summed per chunk (absent = 0)
+    fused = np.zeros(len(results), dtype=np.float64)
+    for leg, cols, weight in zip(legs, leg_columns, weights):
+        if len(leg):
+            np.add.at(fused, cols, weight * _contributions(leg, strategy, rrf_k))
+
+    order = np.argsort(-fused, kind="stable")[:top_k]
+    top = []
+    for idx in order:
+        r = results[idx]
+        r["score"] = float(fused[idx])
+        top.append(r)
+    return top
+
+
+def _contributions(leg: list[dict], strategy: str, rrf_k: int) -> np.ndarray:
+    """Per-result contribution of one leg, in the leg's order."""
+    if strategy == "rrf":
+        return 1.0 / (rrf_k + np.arange(len(leg), dtype=np.float64))
+
+    scores = np.fromiter((r["score"] for r in leg), dtype=np.float64, count=len(leg))
+    if strategy == "minmax":
+        lo, span = scores.min(), np.ptp(scores)
+        return (scores - lo) / span if span > 0 else np.ones_like(scores)
+
+    # dbsf
+    std = scores.std()
+    if std == 0:
+        return np.ones_like(scores)
+    lo = scores.mean() - 3 * std
+    return np.clip((scores - lo) / (6 * std), 0.0, 1.0)
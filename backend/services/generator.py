@@ -2,6 +2,9 @@
 LLM answer generator — uses Google Gemini API to generate cited answers.
 """
 import os
+import re
+from typing import AsyncIterator
+
 from google import genai
 
 from backend.config import GEMINI_API_KEY
@@ -9,6 +12,10 @@ from backend.config import GEMINI_API_KEY
 # ── Singleton client ──
 _client = None
 
+GEMINI_MODEL = "gemini-2.5-flash"
+
+FALLBACK_PREFIX = "[LLM unavailable — showing search results only]"
+
 PROMPT_TEMPLATE = """You are an internal knowledge base assistant.
 Answer the question ONLY using the context provided below.
 If the context does not contain enough information to answer, say "I don't have enough information to answer this question based on the available documents."
@@ -50,43 +57,20 @@ def generate_answer(question: str, ranked_chunks: list[dict]) -> dict:
         Dict with 'answer' text and 'citations' list.
     """
     if not ranked_chunks:
-        return {
-            "answer": "I couldn't find any relevant documents to answer your question.",
-            "citations": [],
-        }
+        return _no_results_answer()
 
-    # Build numbered context
-    context_lines = []
-    for i, chunk in enumerate(ranked_chunks, start=1):
-        title = chunk.get("doc_title", "Unknown")
-        dept = chunk.get("department", "")
-        text = chunk["text"][:600]  # truncate long chunks
-        context_lines.append(f"[{i}] ({title} — {dept} dept): {text}")
-
-    prompt = PROMPT_TEMPLATE.format(
-        question=question,
-        context="\n\n".join(context_lines),
-    )
+    prompt = build_prompt(question, ranked_chunks)
 
     # Call Gemini
     try:
         client = get_gemini_client()
         response = client.models.generate_content(
-            model="gemini-2.5-flash",
+            model=GEMINI_MODEL,
             contents=prompt,
         )
         answer_text = response.text
     except Exception as e:
-        error_msg = str(e)
-        print(f"  ⚠ Gemini API error: {error_msg}")
-        # Return the search results even if LLM fails
-        answer_text = (
-            f"[LLM unavailable — showing search results only]\n\n"
-            f"I found {len(ranked_chunks)} relevant passages but couldn't generate "
-            f"an AI summary. Error: {error_msg[:200]}\n\n"
-            f"Top result from '{ranked_chunks[0].get('doc_title', 'Unknown')}':\n"
-            f"{ranked_chunks[0]['text'][:500]}"
-        )
+        answer_text = _fallback_answer(e, ranked_chunks)
 
     # Parse citations from the answer
     citations = parse_citations(answer_text, ranked_chunks)
@@ -97,24 +81,155 @@ def generate_answer(question: str, ranked_chunks: list[dict]) -> dict:
     }
 
 
+async def generate_answer_async(question: str, ranked_chunks: list[dict]) -> dict:
+    """Async variant of generate_answer using the Gemini client's aio interface."""
+    if not ranked_chunks:
+        return _no_results_answer()
+
+    prompt = build_prompt(question, ranked_chunks)
+
+    try:
+        client = get_gemini_client()
+        response = await client.aio.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=prompt,
+        )
+        answer_text = response.text
+    except Exception as e:
+        answer_text = _fallback_answer(e, ranked_chunks)
+
+    return {
+        "answer": answer_text,
+        "citations": parse_citations(answer_text, ranked_chunks),
+    }
+
+
+async def stream_answer(question: str, ranked_chunks: list[dict]) -> AsyncIterator[str]:
+    """
+    Stream the answer as text deltas using Gemini's streaming API.
+
+    On failure the fallback answer (search results only) is yielded instead,
+    so callers always receive some text.
+    """
+    if not ranked_chunks:
+        yield _no_results_answer()["answer"]
+        return
+
+    prompt = build_prompt(question, ranked_chunks)
+
+    streamed_any = False
+    try:
+        client = get_gemini_client()
+        stream = await client.aio.models.generate_content_stream(
+            model=GEMINI_MODEL,
+            contents=prompt,
+        )
+        async for chunk in stream:
+            if chunk.text:
+                streamed_any = True
+                yield chunk.text
+    except Exception as e:
+        fallback = _fallback_answer(e, ranked_chunks)
+        yield f"\n\n{fallback}" if streamed_any else fallback
+
+
+def build_prompt(question: str, ranked_chunks: list[dict]) -> str:
+    """Build the grounded prompt with numbered sources."""
+    context_lines = []
+    for i, chunk in enumerate(ranked_chunks, start=1):
+        title = chunk.get("doc_title", "Unknown")
+        dept = chunk.get("department", "")
+        text = chunk["text"][:600]  # truncate long chunks
+        context_lines.append(f"[{i}] ({title} — {dept} dept): {text}")
+
+    return PROMPT_TEMPLATE.format(
+        question=question,
+        context="\n\n".join(context_lines),
+    )
+
+
+def _no_results_answer() -> dict:
+    return {
+        "answer": "I couldn't find any relevant documents to answer your question.",
+        "citations": [],
+    }
+
+
+def _fallback_answer(error: Exception, ranked_chunks: list[dict]) -> str:
+    """Answer text used when Gemini fails: return the search results instead."""
+    error_msg = str(error)
+    print(f"  ⚠ Gemini API error: {error_msg}")
+    return (
+        f"{FALLBACK_PREFIX}\n\n"
+        f"I found {len(ranked_chunks)} relevant passages but couldn't generate "
+        f"an AI summary. Error: {error_msg[:200]}\n\n"
+        f"Top result from '{ranked_chunks[0].get('doc_title', 'Unknown')}':\n"
+        f"{ranked_chunks[0]['text'][:500]}"
+    )
+
+
+def is_fallback_answer(answer: str) -> bool:
+    """True if `answer` is (or ends in) the search-results-only fallback."""
+    return FALLBACK_PREFIX in answer
+
+
 def parse_citations(answer: str, chunks: list[dict]) -> list[dict]:
     """
     Extract [N] citation markers from the answer and map to source chunks.
     """
-    import re
     markers = set(int(m) for m in re.findall(r"\[(\d+)\]", answer))
 
     citations = []
     for marker in sorted(markers):
-        idx = marker - 1  # convert 1-indexed to 0-indexed
-        if 0 <= idx < len(chunks):
-            chunk = chunks[idx]
-            citations.append({
-                "marker": marker,
-                "doc_title": chunk.get("doc_title", "Unknown"),
-                "doc_id": chunk.get("doc_id", ""),
-                "department": chunk.get("department", ""),
-                "chunk_text": chunk["text"][:300],  # preview
-            })
+        citation = citation_for(marker, chunks)
+        if citation:
+            citations.append(citation)
 
     return citations
+
+
+def citation_for(marker: int, chunks: list[dict]) -> dict | None:
+    """Map a 1-indexed [N] marker to its source chunk, or None if out of range."""
+    idx = marker - 1  # convert 1-indexed to 0-indexed
+    if not 0 <= idx < len(chunks):
+        return None
+    chunk = chunks[idx]
+    return {
+        "marker": marker,
+        "doc_title": chunk.get("doc_title", "Unknown"),
+        "doc_id": chunk.get("doc_id", ""),
+        "department": chunk.get("department", ""),
+        "chunk_text": chunk["text"][:300],  # preview
+    }
+
+
+class CitationTracker:
+    """
+    Incrementally extracts [N] markers from a streamed answer.
+
+    Only the unscanned tail is searched on each delta; a marker split across
+    deltas (e.g. "[1" + "]") is held back until it completes.
+    """
+
+    def __init__(self, chunks: list[dict]):
+        self.chunks = chunks
+        self._pending = ""
+        self._seen: set[int] = set()
+
+    def feed(self, delta: str) -> list[dict]:
+        """Add streamed text; return citations seen for the first time."""
+        text = self._pending + delta
+        new = []
+        for m in re.finditer(r"\[(\d+)\]", text):
+            marker = int(m.group(1))
+            if marker in self._seen:
+                continue
+            self._seen.add(marker)
+            citation = citation_for(marker, self.chunks)
+            if citation:
+                new.append(citation)
+
+        # Keep a trailing, still-open "[12" for the next delta
+        tail = re.search(r"\[\d*$", text)
+        self._pending = tail.group(0) if tail else ""
+        return new
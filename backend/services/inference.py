@@ -0,0 +1,63 @@
+"""
+Inference backends — loads the embedding and reranker models on PyTorch,
+ONNX Runtime, or ONNX Runtime with dynamic int8 quantization.
+
+Selected with INFERENCE_BACKEND in .env:
+- "torch"      full-precision PyTorch (default)
+- "onnx"       ONNX Runtime, fp32
+- "onnx-int8"  ONNX Runtime, dynamically int8-quantized (exported once into
+               ONNX_MODEL_DIR on first use)
+
+The ONNX backends need `pip install "sentence-transformers[onnx]"`.
+"""
+from sentence_transformers import SentenceTransformer, CrossEncoder
+
+from backend.config import INFERENCE_BACKEND, ONNX_MODEL_DIR, ONNX_QUANTIZATION
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def load_embedding_model(model_name: str, backend: str = INFERENCE_BACKEND) -> SentenceTransformer:
+    """Load a SentenceTransformer on the requested backend."""
+    return _load(SentenceTransformer, model_name, backend)
+
+
+def load_reranker_model(model_name: str, backend: str = INFERENCE_BACKEND) -> CrossEncoder:
+    """Load a CrossEncoder on the requested backend."""
+    return _load(CrossEncoder, model_name, backend)
+
+
+def _load(model_cls, model_name: str, backend: str):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown INFERENCE_BACKEND {backend!r}; expected one of {BACKENDS}.")
+
+    if backend == "torch":
+        return model_cls(model_name)
+
+    if backend == "onnx":
+        # Uses the repo's onnx/model.onnx, exporting it on the fly if missing
+        return model_cls(model_name, backend="onnx")
+
+    # onnx-int8: quantize once, then load the local copy
+    local_dir = ONNX_MODEL_DIR / model_name.replace("/", "__")
+    file_suffix = f"int8_{ONNX_QUANTIZATION}"
+    file_name = f"onnx/model_{file_suffix}.onnx"
+    if not (local_dir / file_name).exists():
+        _export_int8(model_cls, model_name, local_dir, file_suffix)
+    return model_cls(str(local_dir), backend="onnx", model_kwargs={"file_name": file_name})
+
+
+def _export_int8(model_cls, model_name: str, local_dir, file_suffix: str):
+    """Export `model_name` to ONNX and write a dynamically int8-quantized copy to local_dir."""
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    print(f"  Exporting int8 ONNX model for {model_name} ({ONNX_QUANTIZATION}) → {local_dir} ...")
+    model = model_cls(model_name, backend="onnx")
+    # Save tokenizer/config alongside so the quantized model loads from local_dir
+    model.save(str(local_dir))
+    export_dynamic_quantized_onnx_model(
+        model,
+        quantization_config=ONNX_QUANTIZATION,
+        model_name_or_path=str(local_dir),
+        file_suffix=file_suffix,
+    )
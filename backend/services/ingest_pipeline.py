@@ -0,0 +1,298 @@
+"""
+Staged ingestion pipeline — parse, chunk, embed and index documents in parallel.
+
+Stages:
+1. Parse + chunk   — process pool (pdfplumber is CPU-bound and holds the GIL).
+2. Embed           — chunks from many documents are packed into fixed-size
+                     batches so every `encode` call is a full matrix multiply.
+                     On incremental runs, chunks whose content hash matches a
+                     point already stored for the document reuse its vector.
+3. Qdrant upsert   — thread pool fed by a bounded queue.
+4. BM25 write      — one Whoosh writer thread fed by a bounded queue; the
+                     writer stays open for the run and commits once.
+
+Bounded queues give backpressure: if Qdrant or Whoosh fall behind, the embed
+stage blocks, which in turn stops new parse jobs from being submitted.
+"""
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from backend.config import (
+    INGEST_WORKERS, INGEST_EMBED_BATCH_SIZE, INGEST_QUEUE_SIZE, INGEST_UPSERT_THREADS,
+)
+from backend.services.parser import parse_document
+from backend.services.chunker import chunk_document_segments, content_hash
+from backend.services.embedder import (
+    embed_texts, build_chunk_points, upsert_document_points, existing_chunk_vectors,
+)
+from backend.services.bm25_index import BulkIndexer
+
+# Queue sentinel telling a consumer thread to exit
+_STOP = object()
+
+
+@dataclass
+class IngestJob:
+    """One document flowing through the pipeline."""
+    doc_id: str
+    title: str
+    department: str
+    classification: str
+    file_path: Path
+    chunks: list[str] = field(default_factory=list)
+    vectors: list[list[float] | None] = field(default_factory=list)
+    n_segments: int = 0
+    n_chunks: int = 0
+    error: str | None = None
+
+
+def parse_and_chunk(file_path: str) -> tuple[int, list[str]]:
+    """Parse and chunk one file. Runs inside a worker process."""
+    segments = parse_document(Path(file_path))
+    return len(segments), chunk_document_segments(segments)
+
+
+class IngestPipeline:
+    """Runs a list of IngestJobs through the parse → embed → index stages."""
+
+    def __init__(
+        self,
+        workers: int = INGEST_WORKERS,
+        embed_batch_size: int = INGEST_EMBED_BATCH_SIZE,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        upsert_threads: int = INGEST_UPSERT_THREADS,
+        reuse_vectors: bool = True,
+    ):
+        self.workers = max(1, workers)
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.upsert_threads = max(1, upsert_threads)
+        self.reuse_vectors = reuse_vectors
+        self._upsert_queue = queue.Queue(maxsize=queue_size)
+        self._bm25_queue = queue.Queue(maxsize=queue_size)
+
+        # (job, chunk_index) pairs waiting for an embedding batch
+        self._embed_buffer: list[tuple[IngestJob, int]] = []
+        self._remaining: dict[str, int] = {}
+
+        # Per-document completion: a job is done once both index stages finish
+        self._lock = threading.Lock()
+        self._stages_done: dict[str, int] = {}
+        self._chunk_users: dict[str, int] = {}
+        self.completed: list[IngestJob] = []
+        self.failed: list[IngestJob] = []
+        self.embedded_chunks = 0
+        self.reused_chunks = 0
+
+    # ── Public API ──
+
+    def run(self, jobs: list[IngestJob]) -> list[IngestJob]:
+        """
+        Process all jobs.
+
+        Returns:
+            The jobs that were fully indexed in both Qdrant and BM25.
+            Failures are collected in `self.failed`.
+        """
+        if not jobs:
+            return []
+
+        consumers = [
+            threading.Thread(target=self._upsert_worker, name=f"qdrant-upsert-{i}", daemon=True)
+            for i in range(self.upsert_threads)
+        ]
+        consumers.append(threading.Thread(target=self._bm25_worker, name="bm25-writer", daemon=True))
+        for t in consumers:
+            t.start()
+
+        try:
+            self._parse_and_embed(jobs)
+        finally:
+            # Flush the final partial embedding batch, then drain the consumers
+            self._flush_embeddings(final=True)
+            for _ in range(self.upsert_threads):
+                self._upsert_queue.put(_STOP)
+            self._bm25_queue.put(_STOP)
+            for t in consumers:
+                t.join()
+
+        return self.completed
+
+    # ── Stage 1 + 2: parse in processes, embed in fixed-size batches ──
+
+    def _parse_and_embed(self, jobs: list[IngestJob]):
+        max_in_flight = self.workers * 2
+        pending_jobs = iter(jobs)
+        in_flight = {}
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                # Keep a bounded window of parse tasks in flight
+                while len(in_flight) < max_in_flight:
+                    job = next(pending_jobs, None)
+                    if job is None:
+                        break
+                    in_flight[pool.submit(parse_and_chunk, str(job.file_path))] = job
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = in_flight.pop(future)
+                    try:
+                        job.n_segments, job.chunks = future.result()
+                        job.n_chunks = len(job.chunks)
+                    except Exception as e:
+                        self._fail(job, f"Parse error: {e}")
+                        continue
+                    if not job.chunks:
+                        self._fail(job, "No text extracted")
+                        continue
+
+                    print(f"  [{job.department}] {job.title}: "
+                          f"{job.n_segments} segments → {len(job.chunks)} chunks")
+                    self._bm25_queue.put(job)
+                    self._enqueue_for_embedding(job)
+
+    def _enqueue_for_embedding(self, job: IngestJob):
+        job.vectors = [None] * len(job.chunks)
+        stored = self._stored_vectors(job)
+        pending = []
+        for i, chunk in enumerate(job.chunks):
+            vector = stored.get(content_hash(chunk))
+            if vector is not None:
+                job.vectors[i] = vector
+            else:
+                pending.append(i)
+        self.reused_chunks += len(job.chunks) - len(pending)
+
+        if not pending:
+            self._upsert_queue.put(job)  # nothing changed that needs the model
+            return
+        self._remaining[job.doc_id] = len(pending)
+        self._embed_buffer.extend((job, i) for i in pending)
+        self._flush_embeddings()
+
+    def _stored_vectors(self, job: IngestJob) -> dict[str, list[float]]:
+        """Vectors of the document's unchanged chunks (empty on full rebuilds)."""
+        if not self.reuse_vectors:
+            return {}
+        try:
+            return existing_chunk_vectors(job.doc_id)
+        except Exception as e:
+            print(f"  ⚠ [{job.department}] {job.title}: could not read stored vectors ({e}), re-embedding all chunks.")
+            return {}
+
+    def _flush_embeddings(self, final: bool = False):
+        """Encode full batches (and the trailing partial batch when final)."""
+        while len(self._embed_buffer) >= self.embed_batch_size or (final and self._embed_buffer):
+            batch = self._embed_buffer[: self.embed_batch_size]
+            self._embed_buffer = self._embed_buffer[self.embed_batch_size :]
+
+            try:
+                vectors = embed_texts([job.chunks[i] for job, i in batch], batch_size=self.embed_batch_size)
+            except Exception as e:
+                for job in {id(job): job for job, _ in batch}.values():
+                    self._remaining.pop(job.doc_id, None)
+                    self._fail(job, f"Embedding error: {e}")
+                continue
+
+            self.embedded_chunks += len(batch)
+            for (job, i), vector in zip(batch, vectors):
+                if job.doc_id not in self._remaining:
+                    continue  # document already failed
+                job.vectors[i] = vector
+                self._remaining[job.doc_id] -= 1
+                if self._remaining[job.doc_id] == 0:
+                    del self._remaining[job.doc_id]
+                    self._upsert_queue.put(job)  # blocks when Qdrant falls behind
+
+    # ── Stage 3 + 4: index consumers ──
+
+    def _upsert_worker(self):
+        while (job := self._upsert_queue.get()) is not _STOP:
+            try:
+                points = build_chunk_points(
+                    chunks=job.chunks,
+                    vectors=job.vectors,
+                    doc_id=job.doc_id,
+                    doc_title=job.title,
+                    department=job.department,
+                    classification=job.classification,
+                )
+                upsert_document_points(job.doc_id, points)
+            except Exception as e:
+                self._fail(job, f"Qdrant upsert error: {e}")
+                continue
+            job.vectors = []  # never read again; don't hold them until the run ends
+            self._release_chunks(job)
+            self._stage_done(job)
+
+    def _bm25_worker(self):
+        # One writer for the whole run: a single commit + optimize at the end
+        # instead of one segment per document.
+        indexed = []
+        try:
+            indexer = BulkIndexer()
+        except Exception as e:
+            indexer = None
+            print(f"  ⚠ Could not open BM25 writer: {e}")
+
+        while (job := self._bm25_queue.get()) is not _STOP:
+            if indexer is None:
+                self._fail(job, "BM25 writer unavailable")
+                continue
+            try:
+                indexer.add_chunks(
+                    chunks=job.chunks,
+                    doc_id=job.doc_id,
+                    doc_title=job.title,
+                    department=job.department,
+                    classification=job.classification,
+                )
+            except Exception as e:
+                self._fail(job, f"BM25 index error: {e}")
+                continue
+            self._release_chunks(job)
+            indexed.append(job)
+
+        if indexer is None:
+            return
+        try:
+            print(f"  Committing BM25 index ({len(indexed)} documents) ...")
+            indexer.commit()
+        except Exception as e:
+            for job in indexed:
+                self._fail(job, f"BM25 commit error: {e}")
+            return
+        for job in indexed:
+            self._stage_done(job)
+
+    # ── Bookkeeping ──
+
+    def _stage_done(self, job: IngestJob):
+        with self._lock:
+            if job.error:
+                return
+            self._stages_done[job.doc_id] = self._stages_done.get(job.doc_id, 0) + 1
+            if self._stages_done[job.doc_id] == 2:
+                self.completed.append(job)
+
+    def _release_chunks(self, job: IngestJob):
+        """Drop the chunk texts once both index stages have consumed them."""
+        with self._lock:
+            self._chunk_users[job.doc_id] = self._chunk_users.get(job.doc_id, 0) + 1
+            if self._chunk_users[job.doc_id] == 2:
+                del self._chunk_users[job.doc_id]
+                job.chunks = []
+
+    def _fail(self, job: IngestJob, error: str):
+        with self._lock:
+            if job.error:
+                return
+            job.error = error
+            self.failed.append(job)
+        print(f"  ⚠ [{job.department}] {job.title}: {error}, skipping.")
@@ -1,10 +1,41 @@
 """
-Permission resolver — builds Qdrant filters based on the user's roles.
+Permission resolver — builds Qdrant filters based on the user's roles,
+plus optional metadata facets (department, classification).
 """
 from qdrant_client.models import Filter, FieldCondition, MatchValue, MatchAny
 
 from backend.services.auth import UserContext
 
+ALL_ROLES = ["Employee", "HR", "Engineer", "Sales", "Admin"]
+
+
+def department_to_role(department: str) -> str:
+    """Map department name to role name."""
+    mapping = {
+        "HR": "HR",
+        "Engineering": "Engineer",
+        "Sales": "Sales",
+    }
+    return mapping.get(department, "Employee")
+
+
+def access_roles_for(department: str, classification: str) -> list[str]:
+    """
+    Roles allowed to read a document, stored on every chunk in both
+    Qdrant (payload) and BM25 (indexed field).
+    """
+    if classification == "public":
+        return list(ALL_ROLES)
+    # restricted: only the department's role + admin
+    return [department_to_role(department), "Admin"]
+
+
+def allowed_roles_for(user_ctx: UserContext) -> list[str] | None:
+    """Roles to match against a chunk's access_roles, or None if unrestricted (Admin)."""
+    if "Admin" in user_ctx.roles:
+        return None
+    return user_ctx.roles
+
 
 def build_permission_filter(user_ctx: UserContext) -> Filter | None:
     """
@@ -15,7 +46,8 @@ def build_permission_filter(user_ctx: UserContext) -> Filter | None:
     - Other users only see chunks where at least one of their roles
       is in the chunk's access_roles list.
     """
-    if "Admin" in user_ctx.roles:
+    allowed_roles = allowed_roles_for(user_ctx)
+    if allowed_roles is None:
         return None  # Admin sees everything
 
     # Filter: access_roles must contain at least one of the user's roles
@@ -23,35 +55,25 @@ def build_permission_filter(user_ctx: UserContext) -> Filter | None:
         must=[
             FieldCondition(
                 key="access_roles",
-                match=MatchAny(any=user_ctx.roles),
+                match=MatchAny(any=allowed_roles),
             )
         ]
     )
 
 
-def filter_bm25_results(results: list[dict], user_ctx: UserContext) -> list[dict]:
+def build_search_filter(
+    user_ctx: UserContext,
+    department_filter: str | None = None,
+    classification_filter: str | None = None,
+) -> Filter | None:
     """
-    Post-filter BM25 results based on user permissions.
-
-    Since Whoosh doesn't support role-based filtering natively,
-    we filter results after retrieval.
+    Permission filter combined with the request's metadata facets, so the
+    vector leg only scores chunks the user may see *and* asked for.
     """
-    if "Admin" in user_ctx.roles:
-        return results  # Admin sees everything
-
-    filtered = []
-    for r in results:
-        classification = r.get("classification", "public")
-        department = r.get("department", "")
-
-        if classification == "public":
-            # Everyone can see public documents
-            filtered.append(r)
-        elif classification == "restricted":
-            # Only users with the department role can see restricted docs
-            from backend.services.embedder import department_to_role
-            required_role = department_to_role(department)
-            if required_role in user_ctx.roles:
-                filtered.append(r)
-
-    return filtered
+    permission_filter = build_permission_filter(user_ctx)
+    must = list(permission_filter.must) if permission_filter else []
+    if department_filter:
+        must.append(FieldCondition(key="department", match=MatchValue(value=department_filter)))
+    if classification_filter:
+        must.append(FieldCondition(key="classification", match=MatchValue(value=classification_filter)))
+    return Filter(must=must) if must else None
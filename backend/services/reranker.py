@@ -1,8 +1,18 @@
 """
 Cross-encoder reranker — re-scores query-chunk pairs for better precision.
 """
+import asyncio
+
 from sentence_transformers import CrossEncoder
-from backend.config import RERANKER_MODEL
+from backend.config import (
+    RERANKER_MODEL, INFERENCE_BACKEND, RERANK_MAX_BATCH_SIZE, RERANK_MAX_WAIT_MS, RERANK_WORKERS,
+    RERANK_CACHE_SIZE, RERANK_CACHE_TTL_S,
+)
+from backend.services.batching import MicroBatcher
+from backend.services.cache import TTLCache
+from backend.services.chunker import content_hash
+from backend.services.embedder import normalize_query
+from backend.services.inference import load_reranker_model
 
 # ── Singleton ──
 _reranker = None
@@ -11,11 +21,41 @@ _reranker = None
 def get_reranker() -> CrossEncoder:
     global _reranker
     if _reranker is None:
-        print(f"  Loading reranker: {RERANKER_MODEL} ...")
-        _reranker = CrossEncoder(RERANKER_MODEL)
+        print(f"  Loading reranker: {RERANKER_MODEL} ({INFERENCE_BACKEND}) ...")
+        _reranker = load_reranker_model(RERANKER_MODEL)
     return _reranker
 
 
+def _predict_pairs(pairs: list[tuple[str, str]]) -> list[float]:
+    """Score a micro-batch of (query, passage) pairs gathered from concurrent requests."""
+    reranker = get_reranker()
+    return reranker.predict(pairs, batch_size=len(pairs), show_progress_bar=False).tolist()
+
+
+# ── Cross-request batching worker(s) in front of the cross-encoder ──
+_rerank_batcher = MicroBatcher(
+    _predict_pairs,
+    max_batch_size=RERANK_MAX_BATCH_SIZE,
+    max_wait_ms=RERANK_MAX_WAIT_MS,
+    num_workers=RERANK_WORKERS,
+    name="reranker",
+)
+
+
+# ── Score cache: (normalized query, chunk content hash) -> cross-encoder score ──
+# Keys use the chunk's content hash, so re-ingesting a changed chunk naturally
+# misses the cache; stale entries age out via LRU/TTL.
+_score_cache = TTLCache(maxsize=RERANK_CACHE_SIZE, ttl=RERANK_CACHE_TTL_S)
+
+
+def rerank_batcher_stats() -> dict:
+    return _rerank_batcher.stats()
+
+
+def rerank_cache_stats() -> dict:
+    return _score_cache.stats()
+
+
 def rerank(query: str, candidates: list[dict], top_n: int = 8) -> list[dict]:
     """
     Re-score candidates using a cross-encoder model.
@@ -31,14 +71,54 @@ def rerank(query: str, candidates: list[dict], top_n: int = 8) -> list[dict]:
     if not candidates:
         return []
 
-    reranker = get_reranker()
+    norm_query, keys, scores, missing = _cached_scores(query, candidates)
+
+    # Score only uncached pairs (batched together with other in-flight requests)
+    if missing:
+        pairs = [(norm_query, candidates[i]["text"]) for i in missing]
+        _store_scores(keys, scores, missing, _rerank_batcher.run(pairs))
+
+    return _apply_scores(candidates, scores, top_n)
+
+
+async def rerank_async(query: str, candidates: list[dict], top_n: int = 8) -> list[dict]:
+    """Async variant of rerank: awaits the batching worker without holding a thread."""
+    if not candidates:
+        return []
+
+    norm_query, keys, scores, missing = _cached_scores(query, candidates)
+
+    if missing:
+        pairs = [(norm_query, candidates[i]["text"]) for i in missing]
+        new_scores = await asyncio.wrap_future(_rerank_batcher.submit(pairs))
+        _store_scores(keys, scores, missing, new_scores)
+
+    return _apply_scores(candidates, scores, top_n)
+
+
+def _cached_scores(query: str, candidates: list[dict]):
+    """
+    Look up cached scores.
+
+    Returns:
+        (normalized query, cache keys, scores with None for misses, indices of misses)
+    """
+    # The cross-encoder is uncased, so scoring the normalized query is equivalent
+    # and lets "PTO policy?" and "pto policy?" share cache entries.
+    norm_query = normalize_query(query)
+    keys = [(norm_query, c.get("content_hash") or content_hash(c["text"])) for c in candidates]
+    scores = [_score_cache.get(key) for key in keys]
+    missing = [i for i, score in enumerate(scores) if score is None]
+    return norm_query, keys, scores, missing
+
 
-    # Build (query, passage) pairs
-    pairs = [(query, c["text"]) for c in candidates]
+def _store_scores(keys: list, scores: list, missing: list[int], new_scores: list[float]):
+    for i, score in zip(missing, new_scores):
+        scores[i] = score
+        _score_cache.set(keys[i], score)
 
-    # Score all pairs
-    scores = reranker.predict(pairs)
 
+def _apply_scores(candidates: list[dict], scores: list[float], top_n: int) -> list[dict]:
     # Attach scores to candidates
     for candidate, score in zip(candidates, scores):
         candidate["rerank_score"] = float(score)
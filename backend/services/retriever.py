@@ -1,18 +1,62 @@
 """
 Hybrid retriever — combines vector search and BM25 keyword search.
+
+With RETRIEVAL_ENGINE=qdrant both live in Qdrant (dense + sparse BM25
+vectors) and are fused server-side in a single query; `alpha` is not
+applied in that mode.
 """
-from backend.services.embedder import vector_search
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from backend.config import RETRIEVAL_THREADS, RETRIEVAL_LEG_QUEUE, RETRIEVAL_LEG_TIMEOUT_S, RETRIEVAL_ENGINE
+from backend.services.embedder import (
+    vector_search, vector_search_async, native_hybrid_search, native_hybrid_search_async,
+)
 from backend.services.bm25_index import keyword_search
-from backend.services.permissions import build_permission_filter, filter_bm25_results
+from backend.services.fusion import fuse
+from backend.services.permissions import build_search_filter, allowed_roles_for
 from backend.services.auth import UserContext
 
 
+class LegPool:
+    """
+    Thread pool for one retrieval leg with a bounded number of in-flight calls.
+
+    A running call can't be interrupted, so a leg that times out keeps its
+    thread until the call returns. Each leg gets its own pool, so a stalled
+    Whoosh or Qdrant call can't starve the other leg. Once `max_pending`
+    calls are queued or running, submit() refuses new work instead of
+    growing an unbounded backlog; the search then uses the other leg only.
+    """
+
+    def __init__(self, name: str, threads: int = RETRIEVAL_THREADS, max_pending: int = RETRIEVAL_LEG_QUEUE):
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix=f"retrieval-{name}")
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+
+    def submit(self, fn, /, **kwargs) -> Future | None:
+        """Schedule fn(**kwargs); None if the leg is saturated."""
+        if not self._slots.acquire(blocking=False):
+            return None
+        future = self._executor.submit(fn, **kwargs)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+
+# ── One pool per leg, so the vector and BM25 legs run concurrently ──
+_vector_pool = LegPool("vector")
+_bm25_pool = LegPool("bm25")
+
+
 def hybrid_search(
     query: str,
     user_ctx: UserContext,
     department_filter: str | None = None,
     alpha: float = 0.7,
     top_k: int = 20,
+    classification_filter: str | None = None,
 ) -> list[dict]:
     """
     Perform hybrid search combining vector and BM25 results.
@@ -23,93 +67,130 @@ def hybrid_search(
         department_filter: Optional department to filter by.
         alpha: Weight for vector search (1-alpha for BM25).
         top_k: Number of results to return.
+        classification_filter: Optional classification ("public"/"restricted") to filter by.
 
     Returns:
         Fused and sorted list of chunk results.
     """
-    # Build Qdrant permission filter
-    qdrant_filter = build_permission_filter(user_ctx)
+    # Permissions + facets, applied inside both legs so each returns top_k matching chunks
+    qdrant_filter = build_search_filter(user_ctx, department_filter, classification_filter)
+    if RETRIEVAL_ENGINE == "qdrant":
+        return native_hybrid_search(query, qdrant_filter=qdrant_filter, top_k=top_k)
 
+    # Run both legs concurrently: latency is max(vector, BM25), not the sum.
     # Vector search (with permission filter applied server-side)
-    vec_results = vector_search(
+    vec_future = _vector_pool.submit(
+        vector_search,
         query=query,
         qdrant_filter=qdrant_filter,
         top_k=top_k,
     )
 
-    # BM25 keyword search
-    bm25_results = keyword_search(
+    # BM25 keyword search (permission + facet filters applied inside Whoosh)
+    bm25_future = _bm25_pool.submit(
+        keyword_search,
         query=query,
+        allowed_roles=allowed_roles_for(user_ctx),
         department_filter=department_filter,
+        classification_filter=classification_filter,
         top_k=top_k,
     )
 
-    # Post-filter BM25 results for permissions
-    bm25_results = filter_bm25_results(bm25_results, user_ctx)
-
-    # Normalize scores
-    vec_results = _normalize_scores(vec_results)
-    bm25_results = _normalize_scores(bm25_results)
-
-    # Fuse results using reciprocal rank fusion
-    fused = _reciprocal_rank_fusion(vec_results, bm25_results, alpha=alpha)
-
-    # Department filter (if specified, apply to fused results)
-    if department_filter:
-        fused = [r for r in fused if r["department"] == department_filter]
-
-    return fused[:top_k]
-
-
-def _normalize_scores(results: list[dict]) -> list[dict]:
-    """Normalize scores to [0, 1] range."""
-    if not results:
-        return results
-    max_score = max(r["score"] for r in results)
-    min_score = min(r["score"] for r in results)
-    score_range = max_score - min_score
-
-    for r in results:
-        if score_range > 0:
-            r["score"] = (r["score"] - min_score) / score_range
-        else:
-            r["score"] = 1.0
+    # A slow or failing leg degrades to single-leg results instead of stalling
+    deadline = time.monotonic() + RETRIEVAL_LEG_TIMEOUT_S
+    vec_results = _leg_result(vec_future, "vector", deadline)
+    bm25_results = _leg_result(bm25_future, "BM25", deadline)
 
-    return results
+    return _fuse(vec_results, bm25_results, alpha, top_k)
 
 
-def _reciprocal_rank_fusion(
-    vec_results: list[dict],
-    bm25_results: list[dict],
+async def hybrid_search_async(
+    query: str,
+    user_ctx: UserContext,
+    department_filter: str | None = None,
     alpha: float = 0.7,
-    k: int = 60,
+    top_k: int = 20,
+    classification_filter: str | None = None,
 ) -> list[dict]:
     """
-    Fuse two ranked lists using Reciprocal Rank Fusion (RRF).
+    Async variant of hybrid_search for the request path.
 
-    Each result gets a score: alpha * (1 / (k + rank_vec)) + (1-alpha) * (1 / (k + rank_bm25))
-    where rank is the position in each list (0-indexed).
+    The vector leg is fully async (micro-batched encoder + AsyncQdrantClient);
+    Whoosh is synchronous, so the BM25 leg runs on its retrieval pool.
     """
-    # Build lookup by (doc_id, chunk_index) to deduplicate
-    combined = {}
+    qdrant_filter = build_search_filter(user_ctx, department_filter, classification_filter)
+    if RETRIEVAL_ENGINE == "qdrant":
+        return await native_hybrid_search_async(query, qdrant_filter=qdrant_filter, top_k=top_k)
 
-    for rank, r in enumerate(vec_results):
-        key = (r["doc_id"], r.get("chunk_index", r["text"][:50]))
-        if key not in combined:
-            combined[key] = {**r, "vec_rrf": 0.0, "bm25_rrf": 0.0}
-        combined[key]["vec_rrf"] = 1.0 / (k + rank)
+    vec_task = asyncio.ensure_future(vector_search_async(
+        query=query,
+        qdrant_filter=qdrant_filter,
+        top_k=top_k,
+    ))
+    bm25_future = _bm25_pool.submit(
+        keyword_search,
+        query=query,
+        allowed_roles=allowed_roles_for(user_ctx),
+        department_filter=department_filter,
+        classification_filter=classification_filter,
+        top_k=top_k,
+    )
+    bm25_task = asyncio.wrap_future(bm25_future) if bm25_future is not None else None
+
+    _, pending = await asyncio.wait({t for t in (vec_task, bm25_task) if t}, timeout=RETRIEVAL_LEG_TIMEOUT_S)
+    # Stops the vector coroutine; a BM25 call already running finishes in its thread
+    for task in pending:
+        task.cancel()
+
+    vec_results = _task_result(vec_task, "vector")
+    bm25_results = _task_result(bm25_task, "BM25") if bm25_task else _saturated("BM25")
 
-    for rank, r in enumerate(bm25_results):
-        key = (r["doc_id"], r.get("chunk_index", r["text"][:50]))
-        if key not in combined:
-            combined[key] = {**r, "vec_rrf": 0.0, "bm25_rrf": 0.0}
-        combined[key]["bm25_rrf"] = 1.0 / (k + rank)
+    return _fuse(vec_results, bm25_results, alpha, top_k)
 
-    # Compute final fused score
-    for key, r in combined.items():
-        r["score"] = alpha * r["vec_rrf"] + (1 - alpha) * r["bm25_rrf"]
 
-    # Sort by fused score descending
-    fused = sorted(combined.values(), key=lambda x: x["score"], reverse=True)
+def _fuse(
+    vec_results: list[dict] | None,
+    bm25_results: list[dict] | None,
+    alpha: float,
+    top_k: int,
+) -> list[dict]:
+    """Combine the two legs' results (None = leg failed or timed out)."""
+    if vec_results is None and bm25_results is None:
+        raise RuntimeError("Hybrid search failed: both retrieval legs failed or timed out.")
+
+    # Fuse by chunk_id (a chunk found by both legs counts once)
+    return fuse(
+        [vec_results or [], bm25_results or []],
+        weights=[alpha, 1 - alpha],
+        top_k=top_k,
+    )
+
 
-    return fused
+def _leg_result(future: Future | None, name: str, deadline: float) -> list[dict] | None:
+    """Wait for one retrieval leg until the shared deadline; None if it failed, timed out or was skipped."""
+    if future is None:
+        return _saturated(name)
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeoutError:
+        # The call keeps running in its pool; its in-flight slot is freed when it returns
+        print(f"  ⚠ {name} search timed out after {RETRIEVAL_LEG_TIMEOUT_S}s, using other leg only.")
+    except Exception as e:
+        print(f"  ⚠ {name} search failed: {e}")
+    return None
+
+
+def _saturated(name: str) -> None:
+    print(f"  ⚠ {name} search skipped: too many calls in flight (RETRIEVAL_LEG_QUEUE), using other leg only.")
+    return None
+
+
+def _task_result(task: asyncio.Future, name: str) -> list[dict] | None:
+    """Result of a finished async leg; None if it failed or was cancelled on timeout."""
+    if task.cancelled() or not task.done():
+        print(f"  ⚠ {name} search timed out after {RETRIEVAL_LEG_TIMEOUT_S}s, using other leg only.")
+        return None
+    if task.exception() is not None:
+        print(f"  ⚠ {name} search failed: {task.exception()}")
+        return None
+    return task.result()
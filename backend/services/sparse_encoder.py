@@ -0,0 +1,62 @@
+"""
+Sparse (BM25-style) encoder — turns text into sparse vectors for Qdrant.
+
+Documents are stored with BM25's saturated term frequency as the value of
+each term; Qdrant multiplies in the IDF at query time (Modifier.IDF on the
+sparse vector config), so the corpus statistics stay on the server. Queries
+are plain bags of unique terms (weight 1.0).
+
+Tokenization mirrors the Whoosh StandardAnalyzer used by the BM25 index
+(word tokens, lowercased, English stop words and 1-char tokens removed), so
+both keyword engines match the same terms.
+"""
+import re
+import zlib
+from collections import Counter
+
+from qdrant_client.models import SparseVector
+
+from backend.config import SPARSE_BM25_K1, SPARSE_BM25_B, SPARSE_AVG_DOC_LEN
+
+_TOKEN_RE = re.compile(r"\w+(?:\.?\w+)*")
+
+# Same list as whoosh.analysis.STOP_WORDS
+STOP_WORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from",
+    "have", "if", "in", "is", "it", "may", "not", "of", "on", "or", "tbd",
+    "that", "the", "this", "to", "us", "we", "when", "will", "with", "yet",
+    "you", "your",
+))
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens without stop words."""
+    return [
+        t for t in _TOKEN_RE.findall(text.lower())
+        if len(t) > 1 and t not in STOP_WORDS
+    ]
+
+
+def term_id(token: str) -> int:
+    """Stable 32-bit term id (Qdrant sparse indices are uint32)."""
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def encode_document(text: str) -> SparseVector:
+    """BM25 term-frequency component per term; IDF is applied by Qdrant."""
+    tokens = tokenize(text)
+    if not tokens:
+        return SparseVector(indices=[], values=[])
+
+    norm = SPARSE_BM25_K1 * (1 - SPARSE_BM25_B + SPARSE_BM25_B * len(tokens) / SPARSE_AVG_DOC_LEN)
+    weights: dict[int, float] = {}
+    for token, tf in Counter(tokens).items():
+        idx = term_id(token)
+        weights[idx] = weights.get(idx, 0.0) + tf * (SPARSE_BM25_K1 + 1) / (tf + norm)
+    return SparseVector(indices=list(weights), values=list(weights.values()))
+
+
+def encode_query(text: str) -> SparseVector:
+    """Unique query terms with weight 1.0."""
+    indices = sorted({term_id(t) for t in tokenize(text)})
+    return SparseVector(indices=indices, values=[1.0] * len(indices))
@@ -0,0 +1,478 @@
+"""
+Embedded vector store — an in-process alternative to the Qdrant server.
+
+Selected with VECTOR_STORE=embedded. The embedder's collection, upsert and
+search functions then use this store instead of Qdrant, so the rest of the
+app (ingest pipeline, retriever) is unchanged.
+
+Layout on disk (VECTOR_STORE_DIR):
+    CURRENT                       name of the live generation (gen-<ms timestamp>)
+    gen-*/meta.json               dimension, point count, bitmap keys
+    gen-*/vectors.npy             float16 unit vectors
+    gen-*/codes.npy               sign bits (binary quantization)
+    gen-*/bitmaps.npy             packed row bitsets per (field, value)
+    gen-*/payloads.bin            payloads, one JSON record per point
+    gen-*/payloads.offsets.npy    record offsets into payloads.bin
+    gen-*/ids.json                point ids (read by the writer only)
+
+The ingest process loads the store writable, applies upserts/deletes in
+memory and writes a new generation on flush(); API processes memory-map
+every file of the live generation, decode only the top-k payloads, and pick
+up new generations within VECTOR_STORE_REFRESH_S. flush() keeps the previous
+generation on disk so a reader that read CURRENT just before the swap can
+still map it.
+
+Search: a boolean mask from per-value bitmaps of the filter fields (roles,
+department, classification) prefilters the candidates, then float16 dot
+products in blocks give the top-k. With VECTOR_STORE_BINARY=true, Hamming
+distance on the sign bits first shortlists top_k * VECTOR_STORE_OVERSAMPLE
+candidates, which are rescored exactly.
+"""
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from qdrant_client.models import Filter, FieldCondition, MatchAny, MatchValue, PointStruct
+
+from backend.config import (
+    EMBEDDING_DIM, VECTOR_STORE_DIR, VECTOR_STORE_BINARY, VECTOR_STORE_OVERSAMPLE,
+    VECTOR_STORE_REFRESH_S,
+)
+from backend.services.chunker import make_chunk_id
+
+# Payload fields with bitmap indexes (the fields the search filters use)
+BITMAP_FIELDS = ("access_roles", "department", "classification")
+
+_BLOCK = 65536  # rows scored per NumPy call, bounds temporary memory
+
+
+def payload_to_result(payload: dict, score: float, source: str = "vector") -> dict:
+    """Result dict for one chunk, shared by the Qdrant and embedded backends."""
+    chunk_index = payload.get("chunk_index", 0)
+    return {
+        "text": payload["text"],
+        # Points ingested before chunk_id was stored derive it the same way
+        "chunk_id": payload.get("chunk_id") or make_chunk_id(payload["doc_id"], chunk_index),
+        "doc_id": payload["doc_id"],
+        "doc_title": payload["doc_title"],
+        "department": payload["department"],
+        "classification": payload.get("classification", "public"),
+        "chunk_index": chunk_index,
+        "content_hash": payload.get("content_hash"),
+        "score": score,
+        "source": source,
+    }
+
+
+class _PayloadFile:
+    """Memory-mapped payload records, decoded one at a time on access."""
+
+    def __init__(self, gen_dir: Path):
+        self._offsets = np.load(gen_dir / "payloads.offsets.npy", mmap_mode="r")
+        self._blob = np.memmap(gen_dir / "payloads.bin", dtype=np.uint8, mode="r") if self._offsets[-1] else None
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row: int) -> dict:
+        return json.loads(bytes(self._blob[self._offsets[row] : self._offsets[row + 1]]))
+
+
+class EmbeddedVectorStore:
+    """Memory-mapped float16 vector index with bitmap prefiltering."""
+
+    def __init__(
+        self,
+        path: Path = VECTOR_STORE_DIR,
+        dim: int = EMBEDDING_DIM,
+        binary: bool = VECTOR_STORE_BINARY,
+        oversample: int = VECTOR_STORE_OVERSAMPLE,
+    ):
+        self.path = path
+        self.dim = dim
+        self.binary = binary
+        self.oversample = max(1, oversample)
+
+        self._lock = threading.RLock()
+        self._generation: str | None = None
+        self._last_refresh_check = float("-inf")
+        self._loaded = False
+        self._writable = False
+        self._clear()
+
+    # ── Collection management ──
+
+    def ensure(self):
+        """Load the store for writing, creating an empty one if missing."""
+        with self._lock:
+            if not self._writable:
+                self._load(writable=True)
+            print(f"  Embedded vector store: {self.path} ({self._count} points)")
+
+    def reset(self):
+        """Drop every point (persisted on the next flush)."""
+        with self._lock:
+            self._clear()
+            self._writable = True
+            print(f"  Reset embedded vector store: {self.path}")
+
+    def flush(self):
+        """Write the live points as a new generation and make it current."""
+        with self._lock:
+            if not self._writable:
+                return
+            self._compact()
+            generation = f"gen-{int(time.time() * 1000):013d}"
+            gen_dir = self.path / generation
+            gen_dir.mkdir(parents=True, exist_ok=True)
+            n = self._count
+            np.save(gen_dir / "vectors.npy", self._vectors[:n])
+            np.save(gen_dir / "codes.npy", self._codes[:n])
+
+            offsets = np.zeros(n + 1, dtype=np.int64)
+            with open(gen_dir / "payloads.bin", "wb") as f:
+                for slot, payload in enumerate(self._payloads[:n]):
+                    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                    f.write(data)
+                    offsets[slot + 1] = offsets[slot] + len(data)
+            np.save(gen_dir / "payloads.offsets.npy", offsets)
+
+            bitmaps = self._get_bitmaps()
+            keys = sorted(bitmaps)
+            packed = np.stack([bitmaps[k] for k in keys]) if keys else np.zeros((0, (n + 7) // 8), dtype=np.uint8)
+            np.save(gen_dir / "bitmaps.npy", packed)
+            (gen_dir / "ids.json").write_text(json.dumps(self._ids[:n]))
+            (gen_dir / "meta.json").write_text(json.dumps({
+                "dim": self.dim,
+                "count": n,
+                "bitmap_keys": [list(k) for k in keys],
+            }))
+
+            previous = self._current_generation()
+            tmp = self.path / "CURRENT.tmp"
+            tmp.write_text(generation)
+            tmp.replace(self.path / "CURRENT")
+            self._generation = generation
+
+            # Keep the previous generation for readers that read CURRENT just
+            # before the swap; mapped files stay alive after unlink anyway
+            for old in self.path.glob("gen-*"):
+                if old.name not in (generation, previous):
+                    shutil.rmtree(old, ignore_errors=True)
+            print(f"  Saved embedded vector store: {n} points ({generation})")
+
+    # ── Writes ──
+
+    def upsert(self, doc_id: str, points: list[PointStruct]):
+        """Insert/replace a document's points and drop its other (stale) points."""
+        with self._lock:
+            self._ensure_writable()
+            keep = set()
+            for p in points:
+                vector = p.vector[""] if isinstance(p.vector, dict) else p.vector
+                slot = self._slot_of.get(p.id)
+                if slot is None:
+                    slot = self._append_slot()
+                    self._slot_of[p.id] = slot
+                    self._ids[slot] = p.id
+                self._vectors[slot] = _unit(vector)
+                self._codes[slot] = np.packbits(self._vectors[slot] > 0)
+                self._payloads[slot] = p.payload
+                self._alive[slot] = True
+                self._doc_slots.setdefault(doc_id, set()).add(slot)
+                keep.add(slot)
+            self._delete_slots(doc_id, keep)
+            self._bitmaps = None
+
+    def delete_document(self, doc_id: str, keep_ids: list[str] | None = None):
+        """Delete a document's points, except `keep_ids`."""
+        with self._lock:
+            self._ensure_writable()
+            keep = {self._slot_of[i] for i in keep_ids or [] if i in self._slot_of}
+            self._delete_slots(doc_id, keep)
+            self._bitmaps = None
+
+    def document_vectors(self, doc_id: str) -> dict[str, np.ndarray]:
+        """content_hash -> stored vector for a document's live points."""
+        with self._lock:
+            self._ensure_writable()
+            return {
+                self._payloads[slot]["content_hash"]: self._vectors[slot].astype(np.float32)
+                for slot in self._doc_slots.get(doc_id, ())
+                if self._payloads[slot].get("content_hash")
+            }
+
+    # ── Search ──
+
+    def search(self, query_vector: np.ndarray, qdrant_filter: Filter | None = None, top_k: int = 20) -> list[dict]:
+        """Top-k points by cosine similarity among those matching `qdrant_filter`."""
+        self._maybe_refresh()
+        with self._lock:
+            n = self._count
+            vectors, codes, payloads, alive = self._vectors, self._codes, self._payloads, self._alive
+            bitmaps = self._get_bitmaps() if qdrant_filter is not None else None
+        if n == 0:
+            return []
+
+        mask = _filter_mask(qdrant_filter, alive[:n], bitmaps)
+        candidates = np.flatnonzero(mask) if mask is not None else None
+        if candidates is not None and not candidates.size:
+            return []
+        q = _unit(query_vector)
+        total = n if candidates is None else candidates.size
+
+        # Binary quantization: Hamming shortlist, then exact rescoring
+        shortlist = top_k * self.oversample
+        if self.binary and total > shortlist:
+            q_code = np.packbits(q > 0)
+            distances = _blocked(codes, candidates, total, lambda rows: np.bitwise_count(rows ^ q_code).sum(axis=1))
+            picked = np.argpartition(distances, shortlist - 1)[:shortlist]
+            candidates = picked if candidates is None else candidates[picked]
+            total = candidates.size
+
+        scores = _blocked(vectors, candidates, total, lambda rows: rows.astype(np.float32) @ q)
+        k = min(top_k, total)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        rows = top if candidates is None else candidates[top]
+        return [payload_to_result(payloads[int(r)], float(scores[i])) for r, i in zip(rows, top)]
+
+    def stats(self) -> dict:
+        return {"points": int(self._alive[: self._count].sum()), "generation": self._generation}
+
+    # ── Internal ──
+
+    def _clear(self):
+        self._count = 0  # used slots (live or deleted)
+        self._vectors = np.zeros((0, self.dim), dtype=np.float16)
+        self._codes = np.zeros((0, (self.dim + 7) // 8), dtype=np.uint8)
+        self._ids: list[str | None] = []
+        self._payloads: list[dict | None] | _PayloadFile = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._slot_of: dict[str, int] = {}
+        self._doc_slots: dict[str, set[int]] = {}
+        # Packed row bitset per (field, value); persisted, or rebuilt by the writer
+        self._bitmaps: dict[tuple[str, str], np.ndarray] | None = None
+
+    def _current_generation(self) -> str | None:
+        current = self.path / "CURRENT"
+        return current.read_text().strip() if current.exists() else None
+
+    def _read_generation(self, generation: str) -> dict:
+        """Memory-map a generation's files (readers never decode all payloads)."""
+        gen_dir = self.path / generation
+        meta = json.loads((gen_dir / "meta.json").read_text())
+        if meta["dim"] != self.dim:
+            raise ValueError(
+                f"Embedded vector store has dim {meta['dim']}, model has {self.dim}; re-ingest with --full."
+            )
+        packed = np.load(gen_dir / "bitmaps.npy", mmap_mode="r")
+        return {
+            "gen_dir": gen_dir,
+            "count": meta["count"],
+            "vectors": np.load(gen_dir / "vectors.npy", mmap_mode="r"),
+            "codes": np.load(gen_dir / "codes.npy", mmap_mode="r"),
+            "payloads": _PayloadFile(gen_dir),
+            "bitmaps": {tuple(key): packed[i] for i, key in enumerate(meta["bitmap_keys"])},
+        }
+
+    def _read_current(self) -> tuple[str | None, dict | None]:
+        """Map the generation named by CURRENT, re-reading CURRENT once if a flush removed it meanwhile."""
+        for attempt in range(2):
+            generation = self._current_generation()
+            if generation is None:
+                return None, None
+            try:
+                return generation, self._read_generation(generation)
+            except FileNotFoundError:
+                if attempt:
+                    raise
+
+    def _load(self, writable: bool):
+        """Load the current generation (memory-mapped, or as writable copies)."""
+        generation, data = self._read_current()
+        self._apply(generation, data, writable)
+
+    def _apply(self, generation: str | None, data: dict | None, writable: bool):
+        self._clear()
+        self._writable = writable
+        self._loaded = True
+        self._generation = generation
+        if data is None:
+            return
+
+        self._count = data["count"]
+        self._alive = np.ones(self._count, dtype=bool)
+        if not writable:
+            self._vectors, self._codes = data["vectors"], data["codes"]
+            self._payloads, self._bitmaps = data["payloads"], data["bitmaps"]
+            return
+
+        # The writer (ingest) needs everything in memory to modify and rewrite it
+        self._vectors = np.array(data["vectors"])
+        self._codes = np.array(data["codes"])
+        self._payloads = [data["payloads"][i] for i in range(self._count)]
+        self._ids = json.loads((data["gen_dir"] / "ids.json").read_text())
+        for slot, (point_id, payload) in enumerate(zip(self._ids, self._payloads)):
+            self._slot_of[point_id] = slot
+            self._doc_slots.setdefault(payload["doc_id"], set()).add(slot)
+
+    def _maybe_refresh(self):
+        """Readers: switch to a newer generation written by the ingest process."""
+        if self._writable:
+            return
+        now = time.monotonic()
+        if now - self._last_refresh_check < VECTOR_STORE_REFRESH_S:
+            return
+        if self._loaded and self._current_generation() == self._generation:
+            self._last_refresh_check = now
+            return
+        # Map the new files without the lock; searches keep using the old generation meanwhile
+        try:
+            generation, data = self._read_current()
+        except FileNotFoundError as e:
+            # Not marked as checked, so the next search tries again
+            if not self._loaded:
+                raise
+            print(f"  ⚠ Embedded vector store refresh failed, keeping {self._generation}: {e}")
+            return
+        self._last_refresh_check = now
+        with self._lock:
+            if not self._writable:
+                self._apply(generation, data, writable=False)
+
+    def _ensure_writable(self):
+        if not self._writable:
+            self._load(writable=True)
+
+    def _append_slot(self) -> int:
+        if self._count == len(self._vectors):
+            capacity = max(1024, 2 * self._count)
+            self._vectors = _grow(self._vectors, capacity)
+            self._codes = _grow(self._codes, capacity)
+            self._alive = _grow(self._alive, capacity)
+            self._ids.extend([None] * (capacity - len(self._ids)))
+            self._payloads.extend([None] * (capacity - len(self._payloads)))
+        slot = self._count
+        self._count += 1
+        return slot
+
+    def _delete_slots(self, doc_id: str, keep: set[int]):
+        slots = self._doc_slots.get(doc_id, set())
+        for slot in slots - keep:
+            self._alive[slot] = False
+            self._slot_of.pop(self._ids[slot], None)
+            self._ids[slot] = None
+            self._payloads[slot] = None
+        if keep:
+            self._doc_slots[doc_id] = set(keep)
+        else:
+            self._doc_slots.pop(doc_id, None)
+
+    def _compact(self):
+        """Drop deleted slots before saving."""
+        live = np.flatnonzero(self._alive[: self._count])
+        if live.size == self._count:
+            return
+        self._vectors = self._vectors[live]
+        self._codes = self._codes[live]
+        self._ids = [self._ids[i] for i in live]
+        self._payloads = [self._payloads[i] for i in live]
+        self._count = live.size
+        self._alive = np.ones(self._count, dtype=bool)
+        self._slot_of = {point_id: slot for slot, point_id in enumerate(self._ids)}
+        self._doc_slots = {}
+        for slot, payload in enumerate(self._payloads):
+            self._doc_slots.setdefault(payload["doc_id"], set()).add(slot)
+        self._bitmaps = None
+
+    def _get_bitmaps(self) -> dict[tuple[str, str], np.ndarray]:
+        """Packed row bitsets of the filterable payload fields (writer: rebuilt after changes)."""
+        if self._bitmaps is None:
+            slots: dict[tuple[str, str], list[int]] = {}
+            for slot in range(self._count):
+                payload = self._payloads[slot]
+                if payload is None:
+                    continue
+                for field in BITMAP_FIELDS:
+                    values = payload.get(field)
+                    for value in values if isinstance(values, list) else [values]:
+                        slots.setdefault((field, value), []).append(slot)
+
+            self._bitmaps = {}
+            for key, rows in slots.items():
+                bitmap = np.zeros(self._count, dtype=bool)
+                bitmap[rows] = True
+                self._bitmaps[key] = np.packbits(bitmap)
+        return self._bitmaps
+
+
+def _filter_mask(
+    qdrant_filter: Filter | None,
+    alive: np.ndarray,
+    bitmaps: dict[tuple[str, str], np.ndarray] | None,
+) -> np.ndarray | None:
+    """Rows that are live and match every `must` condition (None = all rows)."""
+    n = len(alive)
+    if qdrant_filter is None:
+        return None if alive.all() else alive
+    if qdrant_filter.should or qdrant_filter.must_not:
+        raise ValueError("Embedded vector store only supports `must` filters.")
+
+    packed = np.full((n + 7) // 8, 0xFF, dtype=np.uint8)
+    for cond in qdrant_filter.must or []:
+        if not isinstance(cond, FieldCondition) or cond.key not in BITMAP_FIELDS:
+            raise ValueError(f"Embedded vector store cannot filter on {cond!r}.")
+        if isinstance(cond.match, MatchAny):
+            values = cond.match.any
+        elif isinstance(cond.match, MatchValue):
+            values = [cond.match.value]
+        else:
+            raise ValueError(f"Embedded vector store cannot filter on {cond!r}.")
+
+        matched = np.zeros_like(packed)
+        for value in values:
+            bitmap = bitmaps.get((cond.key, value))
+            if bitmap is not None:
+                matched |= bitmap[: len(packed)]
+        packed &= matched
+    return np.unpackbits(packed, count=n).astype(bool) & alive
+
+
+def _unit(vector) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else v
+
+
+def _grow(array: np.ndarray, capacity: int) -> np.ndarray:
+    grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+def _blocked(matrix: np.ndarray, rows: np.ndarray | None, total: int, fn) -> np.ndarray:
+    """Apply `fn` to `matrix[rows]` (or its first `total` rows) block by block."""
+    out = None
+    for start in range(0, total, _BLOCK):
+        end = min(start + _BLOCK, total)
+        block = matrix[start:end] if rows is None else matrix[rows[start:end]]
+        values = fn(block)
+        if out is None:
+            out = np.empty(total, dtype=values.dtype)
+        out[start : start + len(values)] = values
+    return out
+
+
+# ── Singleton ──
+_store: EmbeddedVectorStore | None = None
+
+
+def get_embedded_store() -> EmbeddedVectorStore:
+    global _store
+    if _store is None:
+        _store = EmbeddedVectorStore()
+    return _store
@@ -34,3 +34,60 @@ export async function search(token, query, departmentFilter = null) {
     }
     return res.json();
 }
+
+/**
+ * Streaming search over Server-Sent Events.
+ *
+ * Calls handlers.onSources({ sources, chunks_found }) as soon as retrieval is done,
+ * handlers.onToken(text) for each answer delta, handlers.onCitation(citation) when
+ * a source is first cited, and resolves with the final `done` payload.
+ */
+export async function searchStream(token, query, handlers = {}, departmentFilter = null) {
+    const body = { query };
+    if (departmentFilter) body.department_filter = departmentFilter;
+
+    const res = await fetch(`${BASE}/search/stream`, {
+        method: "POST",
+        headers: {
+            "Content-Type": "application/json",
+            Authorization: `Bearer ${token}`,
+        },
+        body: JSON.stringify(body),
+    });
+    if (!res.ok) {
+        const err = await res.json().catch(() => ({}));
+        throw new Error(err.detail || "Search failed");
+    }
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let done = null;
+
+    for (;;) {
+        const { value, done: finished } = await reader.read();
+        if (finished) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line
+        let sep;
+        while ((sep = buffer.indexOf("\n\n")) !== -1) {
+            const raw = buffer.slice(0, sep);
+            buffer = buffer.slice(sep + 2);
+
+            let event = "message";
+            let data = "";
+            for (const line of raw.split("\n")) {
+                if (line.startsWith("event: ")) event = line.slice(7);
+                else if (line.startsWith("data: ")) data += line.slice(6);
+            }
+            const payload = data ? JSON.parse(data) : {};
+
+            if (event === "sources") handlers.onSources?.(payload);
+            else if (event === "token") handlers.onToken?.(payload.text);
+            else if (event === "citation") handlers.onCitation?.(payload);
+            else if (event === "done") done = payload;
+        }
+    }
+    return done;
+}
@@ -1,5 +1,5 @@
 import { useState, useRef, useEffect } from "react";
-import { search } from "../api";
+import { searchStream } from "../api";
 
 const EXAMPLES = [
     "What is the PTO policy?",
@@ -27,9 +27,25 @@ export default function SearchPage({ session, onLogout }) {
         setLoading(true);
         setError(null);
 
+        // Update the last (in-progress) result as events stream in
+        const updateLast = (fn) =>
+            setResults((prev) => [...prev.slice(0, -1), fn(prev[prev.length - 1])]);
+
         try {
-            const data = await search(session.token, text);
-            setResults((prev) => [...prev, { query: text, ...data }]);
+            const final = await searchStream(session.token, text, {
+                onSources: ({ chunks_found }) => {
+                    setLoading(false);
+                    setResults((prev) => [
+                        ...prev,
+                        { query: text, answer: "", citations: [], chunks_found, latency_ms: null },
+                    ]);
+                },
+                onToken: (delta) => updateLast((r) => ({ ...r, answer: r.answer + delta })),
+                onCitation: (c) => updateLast((r) => ({ ...r, citations: [...r.citations, c] })),
+            });
+            if (final) {
+                updateLast((r) => ({ ...r, citations: final.citations, latency_ms: final.latency_ms }));
+            }
             setQuery("");
         } catch (err) {
             setError(err.message);
@@ -96,7 +112,7 @@ export default function SearchPage({ session, onLogout }) {
                                     </div>
                                     <div className="a-body">{r.answer}</div>
                                     <div className="a-meta">
-                                        <span>{r.latency_ms} ms</span>
+                                        <span>{r.latency_ms ?? "…"} ms</span>
                                         <span>{r.chunks_found} chunks</span>
                                         <span>{r.citations.length} sources</span>
                                     </div>
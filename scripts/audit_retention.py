@@ -0,0 +1,63 @@
+"""
+Audit log retention — drops monthly access_audit_log partitions older than
+the retention window and creates upcoming ones. Schedule it daily (cron).
+Run: python scripts/audit_retention.py
+     python scripts/audit_retention.py --months 24 --dry-run
+"""
+import sys
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.config import AUDIT_RETENTION_MONTHS, AUDIT_PARTITIONS_AHEAD
+from backend.database import engine
+from backend.services.audit_partitions import (
+    DEFAULT_PARTITION, add_months, month_start, ensure_partitions, missing_partitions,
+    drop_partitions_before, create_default_partition, default_partition_range,
+)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Drop expired audit log partitions.")
+    arg_parser.add_argument(
+        "--months", type=int, default=AUDIT_RETENTION_MONTHS,
+        help="Keep this many full months before the current one.",
+    )
+    arg_parser.add_argument(
+        "--dry-run", action="store_true",
+        help="Only report partitions that would be created or dropped and stray rows; change nothing.",
+    )
+    args = arg_parser.parse_args()
+
+    cutoff = add_months(month_start(datetime.now(timezone.utc)), -args.months)
+    print(f"=== Audit Log Retention (keeping {cutoff.isoformat()} onwards) ===\n")
+
+    with engine.begin() as conn:
+        # Rows in the default partition mean inserts ran past the pre-created months
+        stray, oldest, newest = default_partition_range(conn)
+        if stray:
+            print(f"  ⚠ {stray} audit rows in {DEFAULT_PARTITION} ({oldest} .. {newest}); "
+                  f"run this job daily so they land in monthly partitions.")
+        # Covering the stray rows' months moves them into their monthly partitions
+        since, until = (oldest, newest) if stray else (None, None)
+        if args.dry_run:
+            for name in missing_partitions(conn, since, AUDIT_PARTITIONS_AHEAD, until):
+                print(f"  Would create {name}")
+            if stray:
+                print(f"  Would move {stray} rows out of {DEFAULT_PARTITION}")
+        else:
+            create_default_partition(conn)
+            created = ensure_partitions(conn, since, AUDIT_PARTITIONS_AHEAD, until)
+            print(f"  ✓ Partitions ensured for {created} months, through {AUDIT_PARTITIONS_AHEAD} months ahead.")
+        dropped = drop_partitions_before(conn, cutoff, dry_run=args.dry_run)
+
+    verb = "Would drop" if args.dry_run else "Dropped"
+    for name in dropped:
+        print(f"  {verb} {name}")
+    print(f"\n  {verb} {len(dropped)} partition(s).")
+
+
+if __name__ == "__main__":
+    main()
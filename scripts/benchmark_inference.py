@@ -0,0 +1,164 @@
+"""
+Inference backend benchmark — compares torch, ONNX and int8 ONNX for the
+embedding model and the reranker: latency, memory, and agreement with the
+first (reference) backend on the sample corpus.
+Run: python scripts/benchmark_inference.py
+     python scripts/benchmark_inference.py --backends torch onnx-int8 --repeat 20
+"""
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.config import DOCUMENTS_DIR, EMBEDDING_MODEL, RERANKER_MODEL
+from backend.services.parser import parse_document
+from backend.services.chunker import chunk_document_segments
+from backend.services.inference import BACKENDS
+
+QUERIES = [
+    "What is the PTO policy?",
+    "What are the salary bands?",
+    "What caused incident 5023?",
+    "What are our pricing tiers?",
+    "What is the tech stack?",
+    "How do I submit a code review?",
+    "What is the sales commission structure?",
+    "What is the remote work policy?",
+]
+RERANK_CANDIDATES = 20
+TOP_K = 5
+
+
+def load_corpus() -> list[str]:
+    """Chunks of every document in the manifest."""
+    manifest = json.loads((DOCUMENTS_DIR / "manifest.json").read_text(encoding="utf-8"))
+    chunks = []
+    for entry in manifest:
+        file_path = DOCUMENTS_DIR / entry["path"]
+        if file_path.exists():
+            chunks.extend(chunk_document_segments(parse_document(file_path)))
+    return chunks
+
+
+def _peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _percentiles(latencies_s: list[float]) -> tuple[float, float]:
+    ms = np.array(latencies_s) * 1000
+    return float(np.percentile(ms, 50)), float(np.percentile(ms, 95))
+
+
+def run_backend(backend: str, corpus: list[str], repeat: int) -> dict:
+    """Benchmark one backend. Runs in a fresh process so peak RSS is per backend."""
+    from backend.services.inference import load_embedding_model, load_reranker_model
+
+    start = time.perf_counter()
+    embedder = load_embedding_model(EMBEDDING_MODEL, backend=backend)
+    reranker = load_reranker_model(RERANKER_MODEL, backend=backend)
+    load_s = time.perf_counter() - start
+
+    candidates = corpus[:RERANK_CANDIDATES]
+
+    # Warm up
+    embedder.encode(QUERIES[0])
+    reranker.predict([(QUERIES[0], candidates[0])])
+
+    # Single-query latency (the serving hot path)
+    encode_lat, rerank_lat = [], []
+    for _ in range(repeat):
+        for q in QUERIES:
+            t = time.perf_counter()
+            embedder.encode(q)
+            encode_lat.append(time.perf_counter() - t)
+
+            t = time.perf_counter()
+            reranker.predict([(q, c) for c in candidates])
+            rerank_lat.append(time.perf_counter() - t)
+
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "peak_rss_mb": _peak_rss_mb(),
+        "encode_ms": _percentiles(encode_lat),
+        "rerank_ms": _percentiles(rerank_lat),
+        "query_vecs": embedder.encode(QUERIES, normalize_embeddings=True),
+        "corpus_vecs": embedder.encode(corpus, normalize_embeddings=True),
+        "rerank_scores": np.array([reranker.predict([(q, c) for c in candidates]) for q in QUERIES]),
+    }
+
+
+def _rank(x: np.ndarray) -> np.ndarray:
+    return np.argsort(np.argsort(x, axis=-1), axis=-1)
+
+
+def compare(ref: dict, other: dict) -> dict:
+    """Agreement of `other` with the reference backend."""
+    # Same text, different backend → how close are the vectors?
+    cosine = float(np.mean(np.sum(ref["corpus_vecs"] * other["corpus_vecs"], axis=1)))
+
+    # Retrieval: overlap of the top-k chunks per query
+    k = min(TOP_K, len(ref["corpus_vecs"]))
+    ref_top = np.argsort(-ref["query_vecs"] @ ref["corpus_vecs"].T, axis=1)[:, :k]
+    other_top = np.argsort(-other["query_vecs"] @ other["corpus_vecs"].T, axis=1)[:, :k]
+    recall = float(np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_top, other_top)]))
+
+    # Reranking: Spearman correlation of scores and top-1 agreement
+    ref_rank, other_rank = _rank(ref["rerank_scores"]), _rank(other["rerank_scores"])
+    spearman = float(np.mean([np.corrcoef(a, b)[0, 1] for a, b in zip(ref_rank, other_rank)]))
+    top1 = float(np.mean(
+        np.argmax(ref["rerank_scores"], axis=1) == np.argmax(other["rerank_scores"], axis=1)
+    ))
+
+    return {"cosine": cosine, "recall": recall, "spearman": spearman, "top1": top1}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark embedding/reranker inference backends.")
+    arg_parser.add_argument(
+        "--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS,
+        help="Backends to compare; the first one is the quality reference.",
+    )
+    arg_parser.add_argument("--repeat", type=int, default=10, help="Passes over the query set.")
+    args = arg_parser.parse_args()
+
+    print("=== Inference Backend Benchmark ===\n")
+    corpus = load_corpus()
+    print(f"  {len(QUERIES)} queries, {len(corpus)} corpus chunks, "
+          f"{min(RERANK_CANDIDATES, len(corpus))} rerank candidates per query\n")
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for backend in args.backends:
+        print(f"  Running {backend} ...")
+        with ctx.Pool(1) as pool:
+            results.append(pool.apply(run_backend, (backend, corpus, args.repeat)))
+
+    ref = results[0]
+    print()
+    print(f"{'backend':<10} {'load s':>7} {'RSS MB':>7} {'enc p50':>8} {'enc p95':>8} "
+          f"{'rr p50':>8} {'rr p95':>8} {'cosine':>7} {'recall@' + str(TOP_K):>9} {'spearman':>9} {'top1':>6}")
+    for r in results:
+        q = compare(ref, r)
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "n/a"
+        print(f"{r['backend']:<10} {r['load_s']:>7.1f} {rss:>7} "
+              f"{r['encode_ms'][0]:>8.2f} {r['encode_ms'][1]:>8.2f} "
+              f"{r['rerank_ms'][0]:>8.2f} {r['rerank_ms'][1]:>8.2f} "
+              f"{q['cosine']:>7.4f} {q['recall']:>9.3f} {q['spearman']:>9.3f} {q['top1']:>6.2f}")
+    print(f"\n  Latencies in ms (single query; rerank = {RERANK_CANDIDATES} pairs). "
+          f"Quality columns are relative to '{ref['backend']}'.\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,29 @@
 """
 Ingestion script — parse, chunk, embed, and index all documents.
-Run: python scripts/ingest.py
+Run: python scripts/ingest.py          (incremental: only changed documents)
+     python scripts/ingest.py --full   (rebuild Qdrant + BM25 from scratch)
 """
 import sys
 import json
+import uuid
+import hashlib
+import argparse
 from pathlib import Path
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from backend.config import DOCUMENTS_DIR
+from backend.config import DOCUMENTS_DIR, INGEST_WORKERS, RETRIEVAL_ENGINE, KEYWORD_ENGINE
 from backend.database import SessionLocal
 from backend.models import Document
-from backend.services.parser import parse_document
-from backend.services.chunker import chunk_document_segments
-from backend.services.embedder import ensure_collection, embed_and_upsert
-from backend.services.bm25_index import create_bm25_index, index_chunks
+from backend.services.embedder import (
+    ensure_collection, reset_collection, migrate_collection, delete_document_points,
+    collection_has_sparse_vectors, flush_vector_store,
+)
+from backend.services.bm25_index import (
+    create_bm25_index, get_bm25_index, bm25_schema_is_current, BulkIndexer, rebuild_keyword_index,
+)
+from backend.services.ingest_pipeline import IngestJob, IngestPipeline
 
 
 def load_manifest() -> list[dict]:
@@ -27,24 +35,85 @@ def load_manifest() -> list[dict]:
     return json.loads(manifest_path.read_text(encoding="utf-8"))
 
 
-def ingest_all():
-    """Run the full ingestion pipeline."""
+def compute_document_hash(file_path: Path, entry: dict) -> str:
+    """
+    Hash a document's bytes together with its manifest metadata.
+
+    Metadata is included because department/classification end up in every
+    chunk's payload, so changing them must trigger a re-index.
+    """
+    h = hashlib.sha256()
+    h.update(file_path.read_bytes())
+    for key in ("title", "department", "classification"):
+        h.update(b"\0")
+        h.update(str(entry[key]).encode("utf-8"))
+    return h.hexdigest()
+
+
+def remove_stale_documents(db, manifest: list[dict]) -> int:
+    """Delete documents that are no longer in the manifest from all stores."""
+    manifest_titles = {entry["title"] for entry in manifest}
+    stale = db.query(Document).filter(Document.title.notin_(manifest_titles)).all()
+
+    if not stale:
+        return 0
+
+    with BulkIndexer(optimize=False) as indexer:
+        for doc in stale:
+            print(f"  [removed] {doc.title}")
+            delete_document_points(doc.id)
+            n_deleted = indexer.delete_document(doc.id)
+            print(f"    → Deleted Qdrant points and {n_deleted} BM25 chunks")
+            db.delete(doc)
+    db.commit()
+
+    return len(stale)
+
+
+def ingest_all(full: bool = False, workers: int = INGEST_WORKERS, migrate: bool = False):
+    """
+    Run the ingestion pipeline.
+
+    Args:
+        full: Rebuild both indexes from scratch. Otherwise only documents whose
+            content hash changed since the last run are re-processed.
+        workers: Number of parser processes.
+        migrate: Apply the configured collection settings to an existing
+            Qdrant collection before ingesting (ignored with `full`).
+    """
     print("=== EKIP Document Ingestion ===\n")
 
     manifest = load_manifest()
     print(f"Found {len(manifest)} documents in manifest.\n")
 
-    # Ensure Qdrant collection exists
-    ensure_collection()
-
-    # Create fresh BM25 index
-    create_bm25_index()
+    if not full and not bm25_schema_is_current():
+        print("  BM25 index missing or built with an older schema — running a full rebuild.")
+        full = True
+
+    if not full and RETRIEVAL_ENGINE == "qdrant" and not collection_has_sparse_vectors():
+        print("  Qdrant collection has no sparse BM25 vectors (RETRIEVAL_ENGINE=qdrant) — running a full rebuild.")
+        full = True
+
+    if full:
+        # Fresh Qdrant collection and BM25 index
+        reset_collection()
+        create_bm25_index()
+    elif migrate:
+        # Apply changed HNSW/quantization/on-disk settings in place
+        migrate_collection()
+        get_bm25_index()
+    else:
+        ensure_collection()
+        get_bm25_index()
+    print(f"  Mode: {'full rebuild' if full else 'incremental'}\n")
 
     # Database session for document metadata
     db = SessionLocal()
 
-    total_chunks = 0
-    success_count = 0
+    # 1. Plan: decide which documents need (re-)processing
+    jobs = []
+    hashes = {}
+    unchanged_count = 0
 
     for entry in manifest:
         file_path = DOCUMENTS_DIR / entry["path"]
@@ -52,75 +121,87 @@ def ingest_all():
         department = entry["department"]
         classification = entry["classification"]
 
-        print(f"  [{department}] {title}")
-
         if not file_path.exists():
-            print(f"    ⚠ File not found: {file_path}, skipping.")
+            print(f"  ⚠ [{department}] {title}: file not found: {file_path}, skipping.")
             continue
 
-        # 1. Parse
-        try:
-            segments = parse_document(file_path)
-        except Exception as e:
-            print(f"    ⚠ Parse error: {e}, skipping.")
-            continue
+        doc_hash = compute_document_hash(file_path, entry)
+        existing = db.query(Document).filter(Document.title == title).first()
 
-        if not segments:
-            print(f"    ⚠ No text extracted, skipping.")
+        if existing and existing.content_hash == doc_hash and not full:
+            unchanged_count += 1
             continue
 
-        # 2. Chunk
-        chunks = chunk_document_segments(segments)
-        print(f"    → {len(segments)} segments → {len(chunks)} chunks")
-
-        # 3. Save document metadata to PostgreSQL
-        import uuid
-        doc_id = str(uuid.uuid4())
-
-        existing = db.query(Document).filter(Document.title == title).first()
+        # Save document metadata to PostgreSQL
         if existing:
-            doc_id = existing.id
-            print(f"    → Document already in DB (id={doc_id[:8]}...), re-indexing.")
+            doc = existing
+            doc.department = department
+            doc.classification = classification
+            doc.file_path = str(entry["path"])
         else:
             doc = Document(
-                id=doc_id,
+                id=str(uuid.uuid4()),
                 title=title,
                 department=department,
                 classification=classification,
                 file_path=str(entry["path"]),
             )
             db.add(doc)
-            db.commit()
-            print(f"    → Saved to PostgreSQL (id={doc_id[:8]}...)")
-
-        # 4. Embed and upsert to Qdrant
-        n_vectors = embed_and_upsert(
-            chunks=chunks,
-            doc_id=doc_id,
-            doc_title=title,
-            department=department,
-            classification=classification,
-        )
-        print(f"    → {n_vectors} vectors upserted to Qdrant")
-
-        # 5. Index in BM25
-        n_bm25 = index_chunks(
-            chunks=chunks,
-            doc_id=doc_id,
-            doc_title=title,
+
+        hashes[doc.id] = doc_hash
+        jobs.append(IngestJob(
+            doc_id=doc.id,
+            title=title,
             department=department,
             classification=classification,
-        )
-        print(f"    → {n_bm25} chunks indexed in Whoosh BM25")
+            file_path=file_path,
+        ))
+    db.commit()
+
+    # Purge removed documents first; the pipeline's final BM25 commit then
+    # optimizes the index once for both deletions and additions.
+    n_removed = remove_stale_documents(db, manifest)
+
+    print(f"  {len(jobs)} documents to process, {unchanged_count} unchanged.\n")
+
+    # 2. Parse → chunk → embed → index
+    pipeline = IngestPipeline(workers=workers, reuse_vectors=not full)
+    completed = pipeline.run(jobs)
+    flush_vector_store()  # embedded store: publish the new generation
+    if KEYWORD_ENGINE == "numpy":
+        rebuild_keyword_index()  # compile the committed Whoosh index for the NumPy engine
+
+    # 3. Record hashes only for documents indexed in both stores, so failed
+    #    documents are retried next run instead of being skipped as unchanged.
+    for job in completed:
+        db.get(Document, job.doc_id).content_hash = hashes[job.doc_id]
+    db.commit()
 
-        total_chunks += len(chunks)
-        success_count += 1
-        print()
+    total_chunks = sum(job.n_chunks for job in completed)
 
     db.close()
 
-    print(f"=== Done! Ingested {success_count}/{len(manifest)} documents, {total_chunks} chunks total. ===")
+    print(
+        f"\n=== Done! Ingested {len(completed)}/{len(jobs)} changed documents, {total_chunks} chunks total "
+        f"({unchanged_count} unchanged, {len(pipeline.failed)} failed, {n_removed} removed). ==="
+    )
+    print(f"    Embedded {pipeline.embedded_chunks} chunks, reused {pipeline.reused_chunks} unchanged chunk vectors.")
 
 
 if __name__ == "__main__":
-    ingest_all()
+    arg_parser = argparse.ArgumentParser(description="Ingest documents into Qdrant and BM25.")
+    arg_parser.add_argument(
+        "--full", action="store_true",
+        help="Rebuild all indexes from scratch instead of re-processing only changed documents.",
+    )
+    arg_parser.add_argument(
+        "--workers", type=int, default=INGEST_WORKERS,
+        help=f"Number of parser processes (default: {INGEST_WORKERS}).",
+    )
+    arg_parser.add_argument(
+        "--migrate-collection", action="store_true",
+        help="Apply the configured Qdrant HNSW/on-disk/quantization settings and payload "
+             "indexes to the existing collection.",
+    )
+    args = arg_parser.parse_args()
+    ingest_all(full=args.full, workers=args.workers, migrate=args.migrate_collection)
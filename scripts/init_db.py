@@ -8,8 +8,12 @@ from pathlib import Path
 # Add project root to path so we can import backend modules
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+from sqlalchemy import text
+
+from backend.config import AUDIT_PARTITIONS_AHEAD
 from backend.database import engine, SessionLocal, Base
-from backend.models import User, Role, user_roles
+from backend.models import User, Role, user_roles, AccessAuditLog
+from backend.services import audit_partitions
 
 
 def init_db():
@@ -18,6 +22,46 @@ def init_db():
     print("✓ All tables created.")
 
 
+def migrate_db():
+    """Add columns introduced after the initial schema (create_all won't alter existing tables)."""
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR"))
+        conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS role_version INTEGER NOT NULL DEFAULT 1"))
+        if not audit_partitions.is_partitioned(conn):
+            migrate_audit_log(conn)
+        audit_partitions.create_default_partition(conn)
+        audit_partitions.ensure_partitions(conn, months_ahead=AUDIT_PARTITIONS_AHEAD)
+    print("✓ Schema migrations applied.")
+
+
+def migrate_audit_log(conn):
+    """
+    Convert a pre-partitioning access_audit_log (comma-separated doc_ids,
+    no indexes) into the monthly-partitioned table, copying its rows.
+    """
+    conn.execute(text("ALTER TABLE access_audit_log RENAME TO access_audit_log_legacy"))
+    conn.execute(text(
+        "ALTER TABLE access_audit_log_legacy RENAME CONSTRAINT access_audit_log_pkey "
+        "TO access_audit_log_legacy_pkey"
+    ))
+    conn.execute(text("ALTER SEQUENCE IF EXISTS access_audit_log_id_seq RENAME TO access_audit_log_legacy_id_seq"))
+
+    AccessAuditLog.__table__.create(conn)
+    audit_partitions.create_default_partition(conn)
+    oldest, newest = conn.execute(text("SELECT min(timestamp), max(timestamp) FROM access_audit_log_legacy")).one()
+    audit_partitions.ensure_partitions(conn, since=oldest, months_ahead=AUDIT_PARTITIONS_AHEAD, until=newest)
+
+    copied = conn.execute(text(
+        "INSERT INTO access_audit_log (user_id, query_text, doc_ids, timestamp, allowed) "
+        "SELECT user_id, query_text, "
+        "       coalesce(string_to_array(nullif(doc_ids, ''), ','), '{}'), "
+        "       coalesce(timestamp, now()), allowed "
+        "FROM access_audit_log_legacy"
+    )).rowcount
+    conn.execute(text("DROP TABLE access_audit_log_legacy"))
+    print(f"✓ access_audit_log converted to monthly partitions ({copied} rows copied).")
+
+
 def seed_roles(db):
     """Seed the 5 roles."""
     role_names = ["Employee", "HR", "Engineer", "Sales", "Admin"]
@@ -59,6 +103,7 @@ def seed_users(db):
 def main():
     print("=== Knowledge Base — Database Initialization ===\n")
     init_db()
+    migrate_db()
 
     db = SessionLocal()
     try: